@@ -1,72 +1,27 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.figure_factory as ff
-import firebase_admin
-from firebase_admin import credentials, firestore, storage, initialize_app
-from datetime import datetime
-import streamlit_authenticator as stauth
-import bcrypt
-import time
-import json
-
-# Initialize Firebase
-firebase_secrets = st.secrets["firebase"]
-
-if not firebase_admin._apps:
-    cred = credentials.Certificate({
-        "type": firebase_secrets["type"],
-        "project_id": firebase_secrets["project_id"],
-        "private_key_id": firebase_secrets["private_key_id"],
-        "private_key": firebase_secrets["private_key"].replace('\\n', '\n'),
-        "client_email": firebase_secrets["client_email"],
-        "client_id": firebase_secrets["client_id"],
-        "auth_uri": firebase_secrets["auth_uri"],
-        "token_uri": firebase_secrets["token_uri"],
-        "auth_provider_x509_cert_url": firebase_secrets["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": firebase_secrets["client_x509_cert_url"]
-    })
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-storage_client = storage.bucket("fitness-tracker-c51bf.firebasestorage.app")
-
-# Function to verify password
-def verify_password(plain_password,hashed_password):
-    return bcrypt.checkpw(plain_password.encode(),hashed_password.encode())
-
-# Check if user is already logged in
-if "authenticated" not in st.session_state:
-    st.session_state["authenticated"] = False
-    st.session_state["username"] = None
-
-# Fetch user credentials from Firestore
-users_ref = db.collection("credentials").stream()
-credentials_dict = {}
-for user in users_ref:
-    user_data = user.to_dict()
-    if "username" in user_data:
-        credentials_dict[user_data["username"]] = user_data
+from datetime import date, datetime, timedelta
+import auth
+import catalog
+import data
+import export
+import features
+import importer
+import metering
+import perf
+import render
+
+auth.init_session_state()
+perf.begin_rerun("admin")
+
+# Date range picker, the last 90 days by default; until both ends are picked it is one day
+def select_date_range(key):
+    picked = st.date_input("Date range",(date.today() - timedelta(days=90),date.today()),key=key)
+    return picked[0], picked[-1]
 
 # If user is already logged in, skip login screen
 if not st.session_state["authenticated"]:
-    st.title("Login")
-    # username_input = st.text_input("Username")
-    # password_input = st.text_input("Password",type="password")
-
-    if st.button("Login"):
-        user_data = credentials_dict.get(username_input)
-
-        if user_data and verify_password(password_input,user_data["password"]):
-            st.session_state["authenticated"] = True
-            st.session_state["username"] = username_input
-            st.session_state["name"] = user_data["name"]  # Store name in session state
-            st.session_state["login_timestamp"] = time.time()
-            st.success(f"Welcome, {user_data['name']}!")
-            st.title('Homepage')
-        else:
-            st.error("Username/password is incorrect")
+    auth.login_form()
 
 else:
     # ------------------- Load Workout Data -------------------
@@ -75,33 +30,12 @@ else:
 
         if username == "admin":
             st.sidebar.title("Admin Panel")
-            admin_action = st.sidebar.radio("Choose Actions",["Add Client","Edit Client","View Client session","Add Session","Edit/Delete Workout"])
-
-            # Fetch client data
-            client_ref = db.collection("client").stream()
-            client_data = {doc.id: doc.to_dict() for doc in client_ref}
-            client_list = [f"{data['first_name']} {data['last_name']}" for data in client_data.values()]
-            client_docs = list(client_ref)
-
-            # Fetch session data
-            session_ref = db.collection("session").stream()
-            session = pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in session_ref])
-            session = session[['id','client_id','sess_date','exercise','set','rep','load_kg']]
-
-            # Fetch exercise data
-            exercise_ref = db.collection("exercise").stream()
-            exercise_list = [doc.to_dict()["exercise"] for doc in exercise_ref]
-
-            # ------------------- Engineer Data -------------------
-            # Dropping the rows where reps are time-based
-            session = session = session[~session["rep"].astype(str).str.contains("s", na=False)]
-            # converting the string to datetime format
-            session["sess_date"] = pd.to_datetime(session["sess_date"],format="%d/%m/%Y")
-            # Convert "rep" to float64
-            session.rep = session.rep.astype('float64')
-            # Add 'One Rep Max' column to session
-            session["one_rm"] = session["load_kg"] * (1 + 0.0333 * session["rep"])
-            rm = session.groupby(["client_id","sess_date","exercise"])[["one_rm"]].mean().reset_index()
+            admin_action = st.sidebar.radio("Choose Actions",["Add Client","Edit Client","View Client session","Add Session","Edit/Delete Workout","Body Composition","Import Sessions","Export Data","Performance"])
+
+            # Fetch client index (client_id -> name)
+            client_index = data.fetch_client_index()
+            client_ids = sorted(client_index)
+            client_name = lambda client_id: f"{client_index[client_id]['first_name']} {client_index[client_id]['last_name']}"
 
             if admin_action == "Add Client":
                 with st.form("Add Client Form"):
@@ -113,7 +47,7 @@ else:
                     source = st.text_input("Source")
                     submitted = st.form_submit_button("Add Client")
                     if submitted:
-                        db.collection("client").add({
+                        data.add_client({
                             "client_id": client_id,
                             "first_name": first_name,
                             "last_name": last_name,
@@ -128,8 +62,9 @@ else:
                 # client_data = {doc.id: doc.to_dict() for doc in client_ref}
                 # client_list = [f"{data['first_name']} {data['last_name']}" for data in client_data.values()]
 
-                selected_client = st.selectbox("Select Client",client_list)
-                client_doc_id = list(client_data.keys())[client_list.index(selected_client)]
+                selected_client = st.selectbox("Select Client",client_ids,format_func=client_name)
+                client_data = data.fetch_client(selected_client)
+                client_doc_id = next(iter(client_data))
                 client_details = client_data[client_doc_id]
 
                 with st.form("Edit Client Form"):
@@ -140,7 +75,7 @@ else:
                     source = st.text_input("Source",client_details["source"])
                     submitted = st.form_submit_button("Update Client")
                     if submitted:
-                        db.collection("client").document(client_doc_id).update({
+                        data.update_client(client_doc_id, {
                             "first_name": first_name,
                             "last_name": last_name,
                             "dob": dob.strftime('%d/%m/%Y'),
@@ -150,8 +85,17 @@ else:
                         st.success("Client updated successfully!")
 
             elif admin_action == "View Client session":
-                selected_client = st.selectbox("Select Client",session["client_id"].unique())
-                client_session = session[session["client_id"] == selected_client]
+                selected_client = st.selectbox("Select Client",client_ids)
+                start, end = select_date_range("view_range")
+                # Only the selected client's sessions in the selected range are read
+                client_session = data.fetch_client_sessions(selected_client, start, end)
+                with perf.span("transform:engineer_sessions") as span:
+                    client_session, _ = features.engineer_sessions(client_session)
+                    span["docs"] = len(client_session)
+                if client_session.empty:
+                    st.info("No workouts in this date range")
+                    st.stop()
+                client_session = client_session[['id','client_id','sess_date','exercise','set','rep','load_kg']]
                 session_selected = st.selectbox("Select a session date",client_session["sess_date"].unique())
                 session_data = client_session[client_session["sess_date"] == session_selected].sort_values('sess_date',ascending=False)
                 session_data = session_data.drop(['id'],axis=1)
@@ -163,31 +107,44 @@ else:
                 st.markdown("---")
 
                 st.write("### Client's Exercise Progress")
-                exercise_table = rm[(rm['client_id'] == selected_client)]
+                exercise_table = data.fetch_one_rm(selected_client)
                 exercise_selected = st.selectbox("Select a exercise",exercise_table["exercise"].unique())
-                exercise_history = exercise_table[exercise_table["exercise"] == exercise_selected]
+                formula = st.selectbox("One Rep Max formula",list(features.ONE_RM_FORMULAS))
+                exercise_history = features.with_formula(exercise_table[exercise_table["exercise"] == exercise_selected],formula)
                 exercise_history = exercise_history.sort_values(by="sess_date",ascending=False)
 
-                fig = ff.create_table(exercise_history)
-                fig.layout.width = 1400
-                st.write(fig)
+                render.table(exercise_history)
 
                 # Line chart for one rep max progression
-                fig = px.line(exercise_history.sort_values("sess_date"),x="sess_date",y="one_rm",
-                              title=f"{exercise_selected} - One Rep Max Progress")
-                st.plotly_chart(fig)
+                render.progress_chart(exercise_history,f"{exercise_selected} - One Rep Max Progress ({formula})")
                 
             elif admin_action == "Add Session":
+                # Exercises are staged here and saved together in one batch
+                staged_session = st.session_state.setdefault("staged_session", [])
+                # Set before the rerun that follows a save, so the message outlives it
+                if st.session_state.pop("session_saved", False):
+                    st.success("Workout added successfully!")
+
+                # Outside the form so the search updates the exercise list as it's typed
+                exercise = catalog.picker("Select an Exercise", username, "session_exercise")
+                with st.expander("New exercise"):
+                    new_exercise = st.text_input("Exercise name")
+                    if st.button("Add to catalog"):
+                        if catalog.add_exercise(new_exercise):
+                            st.success(f"{new_exercise.strip()} added")
+                            st.rerun()
+                        else:
+                            st.error("Enter a name not already in the catalog")
+
                 with st.form("Add Session Form"):
-                    client_id = st.selectbox("Client ID", session["client_id"].unique())
+                    client_id = st.selectbox("Client ID", client_ids)
                     sess_date = st.date_input("Session Date")
-                    exercise = st.selectbox("Select an Exercise",exercise_list)
                     sets = st.number_input("Sets",min_value=1,max_value=10,value=3)
                     reps = st.number_input("Reps",min_value=1,max_value=20,value=10)
                     load_kg = st.number_input("Load (kg)",min_value=0,max_value=200,value=50)
-                    submitted = st.form_submit_button("Add Workout")
-                    if submitted:
-                        db.collection("session").add({
+                    submitted = st.form_submit_button("Add Exercise")
+                    if submitted and exercise:
+                        staged_session.append({
                             "client_id": client_id,
                             "sess_date": sess_date.strftime('%d/%m/%Y'),
                             "exercise": exercise,
@@ -195,12 +152,34 @@ else:
                             "rep": reps,
                             "load_kg": load_kg
                         })
-                        st.success("Workout added successfully!")
+
+                if staged_session:
+                    st.write("### Session to Save")
+                    st.dataframe(pd.DataFrame(staged_session))
+
+                    a, b = st.columns(2)
+                    if a.button("Save Session"):
+                        data.add_sessions(staged_session)
+                        catalog.remember(username, [s["exercise"] for s in staged_session])
+                        staged_session.clear()
+                        st.session_state["session_saved"] = True
+                        st.rerun()
+
+                    if b.button("Clear Session"):
+                        staged_session.clear()
+                        st.rerun()
 
             elif admin_action == "Edit/Delete Workout":
                 st.write("### Edit/Delete Client's Workout")
-                selected_client = st.selectbox("Select Client",session["client_id"].unique())
-                client_session = session[session["client_id"] == selected_client]
+                selected_client = st.selectbox("Select Client",client_ids)
+                start, end = select_date_range("edit_range")
+                client_session = data.fetch_client_sessions(selected_client, start, end)
+                with perf.span("transform:engineer_sessions") as span:
+                    client_session, _ = features.engineer_sessions(client_session)
+                    span["docs"] = len(client_session)
+                if client_session.empty:
+                    st.info("No workouts in this date range")
+                    st.stop()
                 session_selected = st.selectbox("Select a session date",client_session["sess_date"].unique())
                 session_data = client_session[client_session["sess_date"] == session_selected].sort_values('sess_date',ascending=False)
                 workout_to_edit = st.selectbox("Select a workout to edit/delete",session_data["exercise"].unique())
@@ -212,7 +191,7 @@ else:
                 load = st.number_input("Load (kg)",min_value=0,max_value=200,value=int(selected_workout["load_kg"].iloc[0]))
 
                 if st.button("Update Workout"):
-                    db.collection("session").document(workout_id).update({
+                    data.update_session(workout_id, {
                         "set": sets,
                         "rep": reps,
                         "load_kg": load
@@ -221,6 +200,100 @@ else:
                     st.rerun()
 
                 if st.button("Delete Workout"):
-                    db.collection("session").document(workout_id).delete()
+                    data.delete_session(workout_id)
                     st.success("Workout deleted successfully!")
                     st.rerun()
+
+            elif admin_action == "Body Composition":
+                selected_client = st.selectbox("Select Client",client_ids,format_func=client_name)
+                body_com = data.fetch_body_composition(selected_client)
+                if not body_com.empty:
+                    st.write("### Body Composition Records")
+                    st.dataframe(body_com.drop(columns=["id","updated_at"],errors="ignore"),hide_index=True)
+
+                client_details = next(iter(data.fetch_client(selected_client).values()),{})
+                dob_default = datetime.strptime(client_details["dob"],'%d/%m/%Y') if client_details.get("dob") else date(1990,1,1)
+
+                # Saving also recomputes the client's goals shown on their homepage
+                with st.form("Body Composition Form"):
+                    dob = st.date_input("Date of Birth",dob_default,min_value=date(1920,1,1))
+                    body_wt = st.number_input("Body Weight (kg)",min_value=20.0,max_value=300.0,value=70.0,step=0.1)
+                    body_fats = st.number_input("Body Fats %",min_value=1.0,max_value=70.0,value=20.0,step=0.1)
+                    height = st.number_input("Height (cm)",min_value=100,max_value=250,value=170)
+                    activity = st.selectbox("Activity Level",data.fetch_activity_levels()["activity_level"])
+                    diet = st.selectbox("Diet",data.fetch_goal_diets()["diet"])
+                    submitted = st.form_submit_button("Add Body Composition")
+                    if submitted:
+                        data.add_body_composition({
+                            "client_id": selected_client,
+                            "dob": dob.strftime('%d/%m/%Y'),
+                            "body_wt_kg": body_wt,
+                            "body_fats_%": body_fats,
+                            "ht_cm": height,
+                            "activity_level": activity,
+                            "diet": diet
+                        })
+                        st.success("Body composition added successfully!")
+
+            elif admin_action == "Import Sessions":
+                st.write("### Import Session History")
+                st.caption("A CSV or Excel file with the columns client_id, sess_date (dd/mm/YYYY), exercise, set, rep "
+                           "and load_kg. Importing the same file twice adds its sessions twice.")
+                uploaded = st.file_uploader("Session file",type=["csv","xlsx"])
+                if uploaded is not None and st.button("Import"):
+                    progress = st.empty()
+
+                    def show_progress(stats):
+                        rate = stats["written"] / stats["seconds"] if stats["seconds"] else 0
+                        progress.write(f"{stats['read']:,} rows read, {stats['written']:,} sessions written, "
+                                       f"{stats['rejected']:,} rows rejected ({rate:,.0f} sessions/s)")
+
+                    stats = importer.import_file(uploaded,uploaded.name,set(client_ids),catalog.exercises(),show_progress)
+                    if stats["error"]:
+                        st.error(f"Import stopped: {stats['error']}. {stats['written']:,} sessions were written "
+                                 f"before it stopped; importing the file again would add those twice.")
+                    else:
+                        st.success(f"Imported {stats['written']:,} sessions in {stats['seconds']:.1f} s")
+                    if stats["rejected"]:
+                        st.write("### Rejected Rows")
+                        st.write(dict(stats["reasons"]))
+                        st.dataframe(stats["sample"])
+
+            elif admin_action == "Export Data":
+                st.write("### Export Data")
+                collection = st.selectbox("Collection",export.COLLECTIONS)
+                selected_client = st.selectbox("Client",[None] + client_ids,
+                                               format_func=lambda client_id: "All clients" if client_id is None else client_name(client_id))
+                file_format = st.radio("Format",list(export.FORMATS),horizontal=True)
+                export.download_button(collection,file_format,selected_client)
+
+            elif admin_action == "Performance":
+                st.write("### Performance")
+                # Spans recorded by this server process, see perf.py
+                spans = perf.spans()
+                if spans.empty:
+                    st.info("No spans recorded yet")
+                    st.stop()
+                pages = sorted(spans["page"].unique())
+                pages_selected = st.multiselect("Pages",pages,default=pages)
+                spans = spans[spans["page"].isin(pages_selected)]
+
+                st.write(f"#### Span durations ({len(spans)} spans)")
+                st.dataframe(perf.summary(spans),hide_index=True)
+
+                st.write("#### Slowest reruns")
+                st.dataframe(perf.reruns(spans).head(20),hide_index=True)
+
+                # Firestore documents read and written, see metering.py
+                st.write("#### Firestore usage of the heaviest reruns")
+                usage = metering.reruns()
+                usage = usage[usage["page"].isin(pages_selected)]
+                st.caption(f"Budget per rerun: {metering.RERUN_READ_BUDGET} reads, {metering.RERUN_WRITE_BUDGET} writes; "
+                           f"{(usage['over budget'] != '').sum()} of these reruns went over it")
+                st.dataframe(usage.sort_values("reads",ascending=False).head(20),hide_index=True)
+
+                st.write("#### Daily Firestore usage per page and user")
+                daily = metering.daily_totals()
+                st.dataframe(daily,hide_index=True)
+                st.download_button("Download daily totals (CSV)",daily.to_csv(index=False),
+                                   file_name=f"firestore_usage_{date.today()}.csv",mime="text/csv")
@@ -0,0 +1,56 @@
+import time
+
+import bcrypt
+import streamlit as st
+
+import connection
+
+
+# Function to verify password
+def verify_password(plain_password, hashed_password):
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+
+# Fetch the credential document of a single user
+def fetch_credential(username: str) -> dict | None:
+    query = connection.db().collection("credentials").where("username", "==", username).limit(1)
+    for doc in query.stream():
+        return doc.to_dict()
+    return None
+
+
+# Return the user's credential document if the password matches, otherwise None. The
+# document is read on every login attempt, so a changed or deleted password takes
+# effect at once.
+def check_credentials(username: str, password: str) -> dict | None:
+    user_data = fetch_credential(username)
+    if not user_data or not verify_password(password, user_data["password"]):
+        return None
+    return user_data
+
+
+# Check if user is already logged in
+def init_session_state():
+    if "authenticated" not in st.session_state:
+        st.session_state["authenticated"] = False
+        st.session_state["username"] = None
+
+
+# Login screen; credentials are only fetched once the Login button is pressed
+def login_form():
+    st.title("Login")
+    username_input = st.text_input("Username")
+    password_input = st.text_input("Password", type="password")
+
+    if st.button("Login"):
+        user_data = check_credentials(username_input, password_input)
+
+        if user_data:
+            st.session_state["authenticated"] = True
+            st.session_state["username"] = username_input
+            st.session_state["name"] = user_data["name"]  # Store name in session state
+            st.session_state["login_timestamp"] = time.time()
+            st.success(f"Welcome, {user_data['name']}!")
+            st.title('Homepage')
+        else:
+            st.error("Username/password is incorrect")
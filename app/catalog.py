@@ -0,0 +1,142 @@
+import bisect
+import threading
+from collections import deque
+
+import streamlit as st
+from firebase_admin import firestore
+
+import connection
+import perf
+
+# The exercise list is read again only when rollups/exercise_catalog's version changes
+# (checked at most once per VERSION_TTL seconds), or after CATALOG_TTL seconds to pick
+# up exercises edited by hand in the console
+VERSION_TTL = 60
+CATALOG_TTL = 3600
+
+# Exercises remembered per user, most recent first
+RECENT_LIMIT = 8
+
+# Substring matches are looked up through an index of every name's trigrams
+GRAM = 3
+
+
+def _db():
+    return connection.db()
+
+
+def _version_ref():
+    return _db().collection("rollups").document("exercise_catalog")
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def _version() -> int:
+    doc = _version_ref().get()
+    return (doc.to_dict() or {}).get("version", 0) if doc.exists else 0
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+# Sorted exercise names with their lowercase forms, a sorted (word, name index) list
+# for prefix lookups by bisection and a trigram -> name indexes map for substrings
+@st.cache_resource(ttl=CATALOG_TTL, max_entries=2, show_spinner=False)
+@perf.timed("read:exercise", docs=lambda catalog: len(catalog["names"]))
+def _catalog(version: int) -> dict:
+    names = sorted({doc.to_dict()["exercise"] for doc in _db().collection("exercise").stream()}, key=str.lower)
+    lower = [name.lower() for name in names]
+    words = sorted((word, i) for i, name in enumerate(lower) for word in {name, *name.split()})
+    grams = {}
+    for i, name in enumerate(lower):
+        for gram in _grams(name):
+            grams.setdefault(gram, set()).add(i)
+    return {"names": names, "lower": lower, "words": words, "grams": grams}
+
+
+def exercises() -> list[str]:
+    return _catalog(_version())["names"]
+
+
+# Names with a word starting with term, or containing it
+def _matches(catalog: dict, term: str) -> set[int]:
+    words = catalog["words"]
+    found = set()
+    for word, i in words[bisect.bisect_left(words, (term,)):]:
+        if not word.startswith(term):
+            break
+        found.add(i)
+    if len(term) >= GRAM:
+        candidates = set.intersection(*(catalog["grams"].get(gram, set()) for gram in _grams(term)))
+        found |= {i for i in candidates if term in catalog["lower"][i]}
+    return found
+
+
+# Exercises matching every term of query; names starting with the query come first,
+# then names with a word starting with its first term, then the rest
+def search(query: str, limit: int | None = None) -> list[str]:
+    catalog = _catalog(_version())
+    terms = query.lower().split()
+    if not terms:
+        return catalog["names"][:limit]
+    found = set.intersection(*(_matches(catalog, term) for term in terms))
+    query = " ".join(terms)
+    lower = catalog["lower"]
+
+    def rank(i):
+        if lower[i].startswith(query):
+            return 0
+        return 1 if any(word.startswith(terms[0]) for word in lower[i].split()) else 2
+    return [catalog["names"][i] for i in sorted(found, key=lambda i: (rank(i), i))][:limit]
+
+
+# Add an exercise unless one of the same name (in any case) exists; every process
+# picks it up within VERSION_TTL seconds
+def add_exercise(name: str) -> bool:
+    name = name.strip()
+    if not name or name.lower() in {existing.lower() for existing in exercises()}:
+        return False
+    _db().collection("exercise").add({"exercise": name})
+    _version_ref().set({"version": firestore.Increment(1), "updated_at": firestore.SERVER_TIMESTAMP}, merge=True)
+    _version.clear()
+    return True
+
+
+# ------------------- Recent exercises -------------------
+# Kept per process in memory, so they cost no reads
+
+@st.cache_resource(show_spinner=False)
+def _recents() -> dict:
+    return {"users": {}, "lock": threading.Lock()}
+
+
+def remember(user: str, exercises: list[str]) -> None:
+    recents = _recents()
+    with recents["lock"]:
+        recent = recents["users"].setdefault(user, deque(maxlen=RECENT_LIMIT))
+        for exercise in exercises:
+            if exercise in recent:
+                recent.remove(exercise)
+            recent.appendleft(exercise)
+
+
+def recent(user: str) -> list[str]:
+    recents = _recents()
+    with recents["lock"]:
+        return list(recents["users"].get(user, ()))
+
+
+# Search box and exercise selectbox; with no search the user's recent exercises are
+# listed first
+def picker(label: str, user: str, key: str) -> str | None:
+    query = st.text_input("Search exercises", key=f"{key}_query", placeholder="e.g. bench, squat, row")
+    if query.strip():
+        options = search(query)
+    else:
+        names = exercises()
+        known = set(names)
+        mine = [exercise for exercise in recent(user) if exercise in known]
+        options = mine + [name for name in names if name not in mine]
+    if not options:
+        st.caption("No exercise matches the search")
+    return st.selectbox(label, options, key=key)
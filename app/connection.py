@@ -0,0 +1,70 @@
+import time
+
+import firebase_admin
+import streamlit as st
+from firebase_admin import credentials, firestore, storage
+
+import metering
+
+BUCKET_NAME = "fitness-tracker-c51bf.firebasestorage.app"
+
+# Seconds between round trips checking that the shared connection still works
+HEALTH_CHECK_INTERVAL = 300
+
+
+def _app():
+    if not firebase_admin._apps:
+        firebase_secrets = st.secrets["firebase"]
+        cred = credentials.Certificate({
+            "type": firebase_secrets["type"],
+            "project_id": firebase_secrets["project_id"],
+            "private_key_id": firebase_secrets["private_key_id"],
+            "private_key": firebase_secrets["private_key"].replace('\\n', '\n'),
+            "client_email": firebase_secrets["client_email"],
+            "client_id": firebase_secrets["client_id"],
+            "auth_uri": firebase_secrets["auth_uri"],
+            "token_uri": firebase_secrets["token_uri"],
+            "auth_provider_x509_cert_url": firebase_secrets["auth_provider_x509_cert_url"],
+            "client_x509_cert_url": firebase_secrets["client_x509_cert_url"]
+        })
+        firebase_admin.initialize_app(cred)
+    return firebase_admin.get_app()
+
+
+# Checked whenever the cached connection is about to be reused. firebase_admin keeps
+# one Firestore client per app, so a connection that stopped working is dropped along
+# with its app and the next call initializes both again.
+def _healthy(connection: dict) -> bool:
+    app = connection["app"]
+    if firebase_admin._apps.get(app.name) is not app:
+        return False
+    if time.monotonic() - connection["checked_at"] < HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        connection["db"].collection("rollups").document("health").get(timeout=10)
+    except Exception:
+        firebase_admin.delete_app(app)
+        return False
+    connection["checked_at"] = time.monotonic()
+    return True
+
+
+# One Firebase app, Firestore client (and its gRPC channel) and Storage bucket per process
+@st.cache_resource(show_spinner=False, validate=_healthy)
+def _connection() -> dict:
+    app = _app()
+    return {
+        "app": app,
+        "db": firestore.client(app),
+        "bucket": storage.bucket(BUCKET_NAME, app=app),
+        "checked_at": time.monotonic(),
+    }
+
+
+# Reads and writes through this client are counted per rerun, see metering.py
+def db():
+    return metering.metered(_connection()["db"])
+
+
+def bucket():
+    return _connection()["bucket"]
@@ -0,0 +1,337 @@
+from collections import Counter
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+
+import streamlit as st
+import pandas as pd
+from firebase_admin import firestore
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import connection
+import features
+import perf
+import rollups
+
+# Cache lifetimes in seconds
+SESSION_TTL = 300
+CLIENT_TTL = 600
+# activity_level and goal_diet are only ever edited by hand in the console; edits
+# reach every client's goals within the hour
+GOAL_TABLE_TTL = 3600
+
+# Documents per request when paging through a query with cursors
+PAGE_SIZE = 500
+# Meals per page of the meal history
+MEAL_PAGE_SIZE = 12
+
+# Threads issuing independent reads at the same time, see fetch_concurrently
+FETCH_WORKERS = 8
+# Threads committing the batches of a bulk import at the same time, see import_sessions
+IMPORT_WORKERS = 4
+
+
+def _db():
+    return connection.db()
+
+
+# ------------------- Fetch -------------------
+# Every fetch is cached per query (the function arguments), so a rerun only goes to
+# Firestore once the entry expires or a write below has invalidated it. Only reads
+# that reach Firestore are recorded as perf spans.
+
+# Fetch session data of one client
+@st.cache_data(ttl=SESSION_TTL, show_spinner=False)
+@perf.timed("read:session")
+def fetch_sessions(client_id: str) -> pd.DataFrame:
+    query = _db().collection("session").where("client_id", "==", client_id)
+    return pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in query.stream()])
+
+
+# Fetch one client's session data between two dates (inclusive), a page at a time
+@st.cache_data(ttl=SESSION_TTL, show_spinner=False)
+@perf.timed("read:session (date range)")
+def fetch_client_sessions(client_id: str, start: date, end: date) -> pd.DataFrame:
+    rollups.ensure_sess_day()
+    query = (_db().collection("session")
+             .where("client_id", "==", client_id)
+             .where("sess_day", ">=", start.isoformat())
+             .where("sess_day", "<=", end.isoformat())
+             .order_by("sess_day")
+             .limit(PAGE_SIZE))
+    rows = []
+    page = list(query.stream())
+    while page:
+        rows += [doc.to_dict() | {"id": doc.id} for doc in page]
+        if len(page) < PAGE_SIZE:
+            break
+        page = list(query.start_after(page[-1]).stream())
+    return pd.DataFrame(rows)
+
+
+# Fetch one page of a client's meals between two dates (inclusive), newest first.
+# after is the (date, document id) of the last meal of the previous page; returns the
+# meals and the cursor of the next page, or None on the last page.
+@st.cache_data(ttl=SESSION_TTL, show_spinner=False)
+@perf.timed("read:nutrition (page)", docs=lambda page: len(page[0]))
+def fetch_meals_page(client_id: str, start: date, end: date,
+                     after: tuple[str, str] | None = None) -> tuple[list[dict], tuple[str, str] | None]:
+    meals_ref = _db().collection("nutrition")
+    query = (meals_ref
+             .where("client_id", "==", client_id)
+             .where("date", ">=", start.isoformat())
+             .where("date", "<=", end.isoformat())
+             .order_by("date", direction=firestore.Query.DESCENDING)
+             .order_by("__name__", direction=firestore.Query.DESCENDING))
+    if after is not None:
+        query = query.start_after({"date": after[0], "__name__": meals_ref.document(after[1])})
+    meals = [doc.to_dict() | {"id": doc.id} for doc in query.limit(MEAL_PAGE_SIZE + 1).stream()]
+    if len(meals) <= MEAL_PAGE_SIZE:
+        return meals, None
+    meals = meals[:MEAL_PAGE_SIZE]
+    return meals, (meals[-1]["date"], meals[-1]["id"])
+
+
+# Fetch the daily One Rep Max of one client, maintained on write by rollups.py
+@st.cache_data(ttl=SESSION_TTL, show_spinner=False)
+@perf.timed("read:one_rm_daily")
+def fetch_one_rm(client_id: str) -> pd.DataFrame:
+    return rollups.fetch_one_rm(client_id)
+
+
+# Fetch client data of one client, keyed by document id
+@st.cache_data(ttl=CLIENT_TTL, show_spinner=False)
+@perf.timed("read:client")
+def fetch_client(client_id: str) -> dict[str, dict]:
+    query = _db().collection("client").where("client_id", "==", client_id)
+    return {doc.id: doc.to_dict() for doc in query.stream()}
+
+
+# Fetch the names of every client keyed by client_id, from the client_index rollup
+@st.cache_data(ttl=CLIENT_TTL, show_spinner=False)
+@perf.timed("read:client_index")
+def fetch_client_index() -> dict[str, dict]:
+    return rollups.fetch_client_index()
+
+
+# Count clients with an aggregation query
+@st.cache_data(ttl=CLIENT_TTL, show_spinner=False)
+@perf.timed("read:client (count)", docs=None)
+def fetch_client_count() -> int:
+    return rollups.count_clients()
+
+
+# Fetch the number of days each client trained in a month ("YYYY-MM"), from the
+# session_months rollup
+@st.cache_data(ttl=SESSION_TTL, show_spinner=False)
+@perf.timed("read:session_months")
+def fetch_session_days(month: str) -> dict[str, int]:
+    return rollups.fetch_session_days(month)
+
+
+# Fetch body_composition data of one client
+@st.cache_data(ttl=CLIENT_TTL, show_spinner=False)
+@perf.timed("read:body_composition")
+def fetch_body_composition(client_id: str) -> pd.DataFrame:
+    query = _db().collection("body_composition").where("client_id", "==", client_id)
+    return pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in query.stream()])
+
+
+# Fetch activity_level data
+@st.cache_data(ttl=GOAL_TABLE_TTL, show_spinner=False)
+@perf.timed("read:activity_level")
+def fetch_activity_levels() -> pd.DataFrame:
+    return pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in _db().collection("activity_level").stream()])
+
+
+# Fetch goal_diet data
+@st.cache_data(ttl=GOAL_TABLE_TTL, show_spinner=False)
+@perf.timed("read:goal_diet")
+def fetch_goal_diets() -> pd.DataFrame:
+    return pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in _db().collection("goal_diet").stream()])
+
+
+# ------------------- Concurrent Fetch -------------------
+
+@st.cache_resource(show_spinner=False)
+def _fetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+
+def _run_in_ctx(ctx, fetch, args):
+    # Cached fetches need the rerun's context to reach st.cache_data
+    add_script_run_ctx(None, ctx)
+    return fetch(*args)
+
+
+# Run independent fetches at the same time and wait for all of them, e.g.
+#   fetch_concurrently(session=(fetch_sessions, client_id), client=(fetch_client, client_id))
+# returns {"session": ..., "client": ...}; the slowest fetch sets the latency
+def fetch_concurrently(**fetches: tuple) -> dict:
+    ctx = get_script_run_ctx()
+    futures = {name: _fetch_pool().submit(_run_in_ctx, ctx, fetch, args)
+               for name, (fetch, *args) in fetches.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# ------------------- Write -------------------
+# Writes drop only the cached queries whose result they change, and are stamped
+# with updated_at.
+# Session writes also refresh the one_rm_daily row of the day and exercise they touch,
+# and adds and deletes count the session in the session_months rollup.
+
+def _stamped(fields: dict) -> dict:
+    return fields | {"updated_at": firestore.SERVER_TIMESTAMP}
+
+
+# ISO copy of sess_date ("dd/mm/YYYY"), so sessions can be queried by date range
+def _with_sess_day(fields: dict) -> dict:
+    sess_day = datetime.strptime(fields["sess_date"], features.SESSION_DATE_FORMAT).date()
+    return fields | {"sess_day": sess_day.isoformat()}
+
+
+# Count sessions per client and day in the session_months rollup, within batch
+def _count_session_days(batch, sessions: list[dict], delta: int) -> None:
+    for (client_id, sess_date), count in Counter((s["client_id"], s["sess_date"]) for s in sessions).items():
+        rollups.count_session_day(client_id, sess_date, delta * count, batch)
+
+
+# With a pool, the one_rm_daily rows are refreshed by its threads, each on its own
+def _sessions_written(sessions: list[dict], pool: ThreadPoolExecutor | None = None) -> None:
+    groups = list({(s["client_id"], s["sess_date"], s["exercise"]) for s in sessions})
+    if pool is not None:
+        ctx = get_script_run_ctx()
+        list(pool.map(lambda group: _run_in_ctx(ctx, rollups.refresh_one_rm, group), groups))
+    else:
+        for start in range(0, len(groups), rollups.BATCH_SIZE):
+            batch = _db().batch()
+            for client_id, sess_date, exercise in groups[start:start + rollups.BATCH_SIZE]:
+                rollups.refresh_one_rm(client_id, sess_date, exercise, batch)
+            batch.commit()
+    for client_id in {s["client_id"] for s in sessions}:
+        fetch_sessions.clear(client_id)
+        fetch_one_rm.clear(client_id)
+    for month in {rollups.month_of(s["sess_date"]) for s in sessions}:
+        fetch_session_days.clear(month)
+    fetch_client_sessions.clear()
+
+
+# Add many sessions (e.g. every exercise of a workout) in as few batches as possible;
+# each session takes at most two of a batch's writes, itself and its day count
+def add_sessions(sessions: list[dict]) -> None:
+    chunk_size = rollups.BATCH_SIZE // 2
+    for start in range(0, len(sessions), chunk_size):
+        chunk = sessions[start:start + chunk_size]
+        batch = _db().batch()
+        for fields in chunk:
+            batch.set(_db().collection("session").document(), _stamped(_with_sess_day(fields)))
+        _count_session_days(batch, chunk, 1)
+        batch.commit()
+    _sessions_written(sessions)
+
+
+@st.cache_resource(show_spinner=False)
+def _import_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+
+
+# Write already validated sessions as they come from chunks (lists of session dicts).
+# Batches are filled up to BATCH_SIZE writes counting one per session and one per day
+# counted, and committed by IMPORT_WORKERS threads with at most twice that many batches
+# in flight, so memory stays bounded however many sessions come. on_progress(written)
+# is called on this thread after every commit, so after a failed commit the last call
+# has the sessions written. The one_rm_daily rows of the days touched are refreshed
+# once at the end, in parallel, also when a commit failed.
+def import_sessions(chunks, on_progress=None) -> int:
+    ctx = get_script_run_ctx()
+    pending = {}
+    groups = set()
+    written = 0
+
+    def settle(return_when):
+        nonlocal written
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            n = pending.pop(future)
+            future.result()
+            written += n
+            if on_progress is not None:
+                on_progress(written)
+
+    def submit(sessions):
+        batch = _db().batch()
+        for fields in sessions:
+            batch.set(_db().collection("session").document(), _stamped(_with_sess_day(fields)))
+        _count_session_days(batch, sessions, 1)
+        pending[_import_pool().submit(_run_in_ctx, ctx, batch.commit, ())] = len(sessions)
+        if len(pending) >= 2 * IMPORT_WORKERS:
+            settle(FIRST_COMPLETED)
+
+    try:
+        sessions, days = [], set()
+        for chunk in chunks:
+            for fields in chunk:
+                day = (fields["client_id"], fields["sess_date"])
+                if len(sessions) + 1 + len(days | {day}) > rollups.BATCH_SIZE:
+                    submit(sessions)
+                    sessions, days = [], set()
+                sessions.append(fields)
+                days.add(day)
+                groups.add(day + (fields["exercise"],))
+        if sessions:
+            submit(sessions)
+        settle(ALL_COMPLETED)
+    finally:
+        # After a failed commit, the batches still in flight are waited for and counted
+        done, _ = wait(pending)
+        completed = sum(pending[future] for future in done if future.exception() is None)
+        if completed:
+            written += completed
+            if on_progress is not None:
+                on_progress(written)
+        _sessions_written([{"client_id": client_id, "sess_date": sess_date, "exercise": exercise}
+                           for client_id, sess_date, exercise in groups], _import_pool())
+    return written
+
+
+def update_session(doc_id: str, fields: dict) -> None:
+    ref = _db().collection("session").document(doc_id)
+    ref.update(_stamped(fields))
+    _sessions_written([ref.get().to_dict()])
+
+
+def delete_session(doc_id: str) -> None:
+    ref = _db().collection("session").document(doc_id)
+    session = ref.get().to_dict()
+    batch = _db().batch()
+    batch.delete(ref)
+    _count_session_days(batch, [session], -1)
+    batch.commit()
+    _sessions_written([session])
+
+
+def _client_written(client: dict) -> None:
+    rollups.index_client(client)
+    fetch_client.clear(client["client_id"])
+    fetch_client_index.clear()
+
+
+def add_client(fields: dict) -> None:
+    _db().collection("client").add(_stamped(fields))
+    _client_written(fields)
+    fetch_client_count.clear()
+
+
+def update_client(doc_id: str, fields: dict) -> None:
+    ref = _db().collection("client").document(doc_id)
+    ref.update(_stamped(fields))
+    _client_written(ref.get().to_dict())
+
+
+def add_body_composition(fields: dict) -> None:
+    _db().collection("body_composition").add(_stamped(fields))
+    fetch_body_composition.clear(fields["client_id"])
+
+
+def add_nutrition(fields: dict) -> None:
+    _db().collection("nutrition").add(fields)
+    fetch_meals_page.clear()
@@ -0,0 +1,108 @@
+import functools
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+import connection
+import perf
+
+# Documents per request when paging through a collection with cursors
+EXPORT_PAGE_SIZE = 1000
+
+COLLECTIONS = ["session", "body_composition", "nutrition"]
+FORMATS = {"Parquet": ("parquet", "application/vnd.apache.parquet"), "CSV": ("csv", "text/csv")}
+
+
+def _db():
+    return connection.db()
+
+
+# Columns written per collection; fields not listed are left out. pyarrow is only
+# imported once something is exported.
+def _schema(collection: str):
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("us", tz="UTC")
+    if collection == "session":
+        fields = [("id", pa.string()), ("client_id", pa.string()), ("sess_date", pa.string()),
+                  ("sess_day", pa.string()), ("exercise", pa.string()), ("set", pa.int64()),
+                  # Kept as text, reps may also be times such as "30s"
+                  ("rep", pa.string()), ("load_kg", pa.float64()), ("updated_at", timestamp)]
+    elif collection == "body_composition":
+        fields = [("id", pa.string()), ("client_id", pa.string()), ("dob", pa.string()),
+                  ("body_wt_kg", pa.float64()), ("body_fats_%", pa.float64()), ("ht_cm", pa.float64()),
+                  ("activity_level", pa.string()), ("diet", pa.string()), ("updated_at", timestamp)]
+    else:
+        fields = [("id", pa.string()), ("client_id", pa.string()), ("date", pa.string()), ("meal", pa.string()),
+                  ("image_url", pa.string()), ("thumb_url", pa.string())]
+    return pa.schema(fields)
+
+
+# Documents as a table of schema: missing fields are null, other fields are dropped
+def _to_table(rows: pd.DataFrame, schema):
+    import pyarrow as pa
+
+    columns = {}
+    for field in schema:
+        values = rows[field.name] if field.name in rows else pd.Series([None] * len(rows), index=rows.index)
+        if field.type == pa.string():
+            values = values.where(values.isna(), values.astype(str))
+        elif pa.types.is_timestamp(field.type):
+            values = pd.to_datetime(values, utc=True)
+        else:
+            values = pd.to_numeric(values, errors="coerce")
+        columns[field.name] = pa.array(values, type=field.type, from_pandas=True)
+    return pa.table(columns, schema=schema)
+
+
+# Documents of a collection (of one client, or every client) as DataFrames of at most
+# page_size rows, in document id order
+def pages(collection: str, client_id: str | None = None, page_size: int = EXPORT_PAGE_SIZE):
+    query = _db().collection(collection)
+    if client_id is not None:
+        query = query.where("client_id", "==", client_id)
+    query = query.order_by("__name__").limit(page_size)
+    page = list(query.stream())
+    while page:
+        yield pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in page])
+        if len(page) < page_size:
+            break
+        page = list(query.start_after(page[-1]).stream())
+
+
+# Write a collection to out (a path or binary file) as Parquet or CSV one page at a
+# time, so only one page of documents is in memory; returns the rows written
+def write(collection: str, out, file_format: str = "Parquet", client_id: str | None = None) -> int:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    schema = _schema(collection)
+    writer = pq.ParquetWriter(out, schema) if file_format == "Parquet" else pacsv.CSVWriter(out, schema)
+    rows = 0
+    with perf.span(f"read:export {collection}") as span, writer:
+        for page in pages(collection, client_id):
+            writer.write_table(_to_table(page, schema))
+            rows += len(page)
+        span["docs"] = rows
+    return rows
+
+
+# The file's contents; it is built in a temporary file on disk and read back once done
+def export(collection: str, file_format: str = "Parquet", client_id: str | None = None) -> bytes:
+    with tempfile.TemporaryFile() as out:
+        write(collection, out, file_format, client_id)
+        out.seek(0)
+        return out.read()
+
+
+def file_name(collection: str, file_format: str, client_id: str | None = None) -> str:
+    return f"{collection}_{client_id or 'all'}.{FORMATS[file_format][0]}"
+
+
+# Download button exporting the collection only when clicked, on a separate thread
+def download_button(collection: str, file_format: str, client_id: str | None = None, key: str | None = None) -> None:
+    st.download_button(f"Download {collection} ({file_format})",
+                       functools.partial(export, collection, file_format, client_id),
+                       file_name=file_name(collection, file_format, client_id),
+                       mime=FORMATS[file_format][1], on_click="ignore", key=key)
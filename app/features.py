@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+SESSION_DATE_FORMAT = "%d/%m/%Y"
+SESSION_COLUMNS = ["client_id", "sess_date", "exercise", "set", "rep", "load_kg"]
+RM_KEYS = ["client_id", "sess_date", "exercise"]
+
+# One Rep Max estimates from load and reps, as array operations; Epley stays in the
+# one_rm column
+ONE_RM_FORMULAS = {
+    "Epley": lambda load, rep: load * (1 + 0.0333 * rep),
+    # Only defined below 37 reps
+    "Brzycki": lambda load, rep: np.where(rep < 37, load * 36 / (37 - rep), np.nan),
+    "Lombardi": lambda load, rep: load * rep ** 0.10,
+    "O'Conner": lambda load, rep: load * (1 + 0.025 * rep),
+    "Wathan": lambda load, rep: 100 * load / (48.8 + 53.8 * np.exp(-0.075 * rep)),
+}
+ONE_RM_COLUMNS = {"Epley": "one_rm", "Brzycki": "one_rm_brzycki", "Lombardi": "one_rm_lombardi",
+                  "O'Conner": "one_rm_oconner", "Wathan": "one_rm_wathan"}
+
+
+# Parse "dd/mm/YYYY" session dates, converting each distinct date string only once
+def parse_sess_date(sess_date: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(sess_date):
+        return sess_date
+    codes, uniques = pd.factorize(sess_date)
+    parsed = pd.DatetimeIndex(pd.to_datetime(uniques, format=SESSION_DATE_FORMAT))
+    return pd.Series(parsed.take(codes, allow_fill=True), index=sess_date.index, name=sess_date.name)
+
+
+# Clean a raw session frame and derive the One Rep Max columns, one per formula.
+# Returns the cleaned session frame and their means per client, date and exercise.
+def engineer_sessions(session: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # A client without sessions yet comes back from Firestore without any columns
+    session = session.reindex(columns=session.columns.union(SESSION_COLUMNS, sort=False))
+
+    # Time-based reps ("30s", "1min") don't coerce to a number and are dropped;
+    # missing reps are kept, as before
+    rep = pd.to_numeric(session["rep"], errors="coerce")
+    keep = (rep.notna() | session["rep"].isna()).to_numpy()
+
+    session = session.loc[keep].copy()
+    session["rep"] = rep[keep].astype("float64")
+    session["sess_date"] = parse_sess_date(session["sess_date"])
+    # Add the 'One Rep Max' columns to session
+    load_kg = pd.to_numeric(session["load_kg"], errors="coerce").to_numpy(dtype="float64")
+    rep = session["rep"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, column in ONE_RM_COLUMNS.items():
+            session[column] = ONE_RM_FORMULAS[name](load_kg, rep)
+
+    rm = session.groupby(RM_KEYS, sort=True)[list(ONE_RM_COLUMNS.values())].mean().reset_index()
+    return session, rm
+
+
+# One Rep Max frame showing the estimate of the given formula as its one_rm column
+def with_formula(rm: pd.DataFrame, formula: str) -> pd.DataFrame:
+    column = ONE_RM_COLUMNS[formula]
+    return rm[RM_KEYS + [column]].rename(columns={column: "one_rm"})
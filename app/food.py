@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+
+import gspread
+import pandas as pd
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+
+# Google Sheets credentials and URL setup
+GS_SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1nfQfBRdZkBcI7ZISrLu1ko-MYmizOTa_EV5panWtJjI"
+
+# Cleaned food tables are kept on disk per sheet revision, in Parquet
+FOOD_DIR = os.environ.get("FOOD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "my_fitness_tracker", "food"))
+
+# Seconds between checks of the sheet's revision
+REVISION_TTL = 60
+
+NUMERIC_COLUMNS = [
+    "Weight (g)",
+    "Calories_per_100g (kcal)",
+    "Protein_per_100g (g)",
+    "Fat_per_100g (g)",
+    "Carbs_per_100g (g)",
+    "Sugars_per_100g (g)",
+    "Sodium_per_100g (mg)"
+]
+
+
+# One authorized gspread client and spreadsheet handle per process
+@st.cache_resource(show_spinner=False)
+def _spreadsheet():
+    gs_creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["gcp_service_account"], GS_SCOPE)
+    return gspread.authorize(gs_creds).open_by_url(SHEET_URL)
+
+
+# Drive's modifiedTime of the sheet, which changes with every edit
+@st.cache_data(ttl=REVISION_TTL, show_spinner=False)
+def sheet_revision() -> str:
+    return _spreadsheet().get_lastUpdateTime()
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.fillna(0)
+    df = df.replace(to_replace='N/A', value=0)
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+        elif df[col].dtype == object:
+            # Mixed text and numbers can't be stored in one Parquet column
+            df[col] = df[col].astype(str)
+    return df
+
+
+def _path(revision: str) -> str:
+    return os.path.join(FOOD_DIR, f"food-{hashlib.sha1(revision.encode()).hexdigest()}.parquet")
+
+
+# The cleaned food table of one sheet revision, from memory, then disk, then the sheet
+@st.cache_data(max_entries=2, show_spinner="Loading food table...")
+def load_food_table(revision: str) -> pd.DataFrame:
+    path = _path(revision)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    worksheet = _spreadsheet().worksheet("Sheet1")  # This gets the first worksheet
+    df = _clean(pd.DataFrame(worksheet.get_all_records()))
+
+    os.makedirs(FOOD_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    # Older revisions are never read again
+    for name in os.listdir(FOOD_DIR):
+        if name.endswith(".parquet") and os.path.join(FOOD_DIR, name) != path:
+            os.remove(os.path.join(FOOD_DIR, name))
+    return df
+
+
+def food_table() -> pd.DataFrame:
+    return load_food_table(sheet_revision())
@@ -0,0 +1,63 @@
+import pandas as pd
+
+# Fields of a body_composition document and of the reference tables the goals are
+# computed from
+INPUT_COLUMNS = ["dob", "body_wt_kg", "body_fats_%", "ht_cm", "bmr_multiplier",
+                 "cal_adjustment", "protein_%", "carbs_%", "fats_%"]
+GOAL_COLUMNS = ["fat_mass", "lean_mass", "age", "bmr", "tee", "goal_cal", "goal_pro", "goal_carbs", "goal_fats"]
+ROUNDING = {'body_wt_kg': 2, 'body_fats_%': 2, 'fat_mass': 2, 'lean_mass': 2, 'bmr': 0, 'tee': 0,
+            'goal_cal': 0, 'goal_pro': 0, 'goal_carbs': 0, 'goal_fats': 0}
+
+
+# Body composition records with the BMR multiplier of their activity_level and the
+# calorie adjustment and macro split of their diet; records naming an unknown level
+# or diet are dropped
+def with_reference(body_com: pd.DataFrame, activity_level: pd.DataFrame, goal_diet: pd.DataFrame) -> pd.DataFrame:
+    body_com = body_com.reindex(columns=body_com.columns.union(["activity_level", "diet"], sort=False))
+    multipliers = activity_level.set_index("activity_level")["bmr_multiplier"]
+    diets = goal_diet.set_index("diet")[["cal_adjustment", "protein_%", "carbs_%", "fats_%"]]
+    merged = body_com.assign(bmr_multiplier=body_com["activity_level"].map(multipliers))
+    merged = merged.join(diets, on="diet")
+    return merged[merged["activity_level"].isin(multipliers.index) & merged["diet"].isin(diets.index)]
+
+
+# Age in whole years on today of each date of birth
+def age(dob: pd.Series, today: pd.Timestamp) -> pd.Series:
+    before_birthday = (dob.dt.month > today.month) | ((dob.dt.month == today.month) & (dob.dt.day > today.day))
+    return today.year - dob.dt.year - before_birthday.astype("int64")
+
+
+# Body composition, BMR (Mifflin-St Jeor), TEE and macro goals of every record at once
+def compute(inputs: pd.DataFrame, today: pd.Timestamp | None = None) -> pd.DataFrame:
+    today = today or pd.Timestamp.today()
+    frame = inputs.reindex(columns=inputs.columns.union(INPUT_COLUMNS, sort=False))
+    numeric = [column for column in INPUT_COLUMNS if column != "dob"]
+    frame[numeric] = frame[numeric].apply(pd.to_numeric, errors="coerce")
+    frame["dob"] = pd.to_datetime(frame["dob"], format="%d/%m/%Y", errors="coerce")
+
+    frame["fat_mass"] = frame["body_wt_kg"] * frame["body_fats_%"] / 100
+    frame["lean_mass"] = frame["body_wt_kg"] - frame["fat_mass"]
+    frame["age"] = age(frame["dob"], today)
+    frame["bmr"] = 10 * frame["body_wt_kg"] + 6.25 * frame["ht_cm"] - 5 * frame["age"] + 5
+    frame["tee"] = frame["bmr"] * frame["bmr_multiplier"]
+    frame["goal_cal"] = frame["tee"] + frame["cal_adjustment"]
+    frame["goal_pro"] = frame["goal_cal"] * frame["protein_%"] / 100 / 4
+    frame["goal_carbs"] = frame["goal_cal"] * frame["carbs_%"] / 100 / 4
+    frame["goal_fats"] = frame["goal_cal"] * frame["fats_%"] / 100 / 9
+    return frame.round(ROUNDING)
+
+
+# Latest value of every input per client: the last non-empty one, in record order
+def latest_inputs(merged: pd.DataFrame) -> pd.DataFrame:
+    return merged.reindex(columns=["client_id"] + INPUT_COLUMNS).groupby("client_id", sort=False).last()
+
+
+# Latest goal inputs of each client in body_com, joined with the reference tables.
+# Records are ordered by updated_at; records from before updated_at existed, e.g.
+# entered in the console, count as the oldest.
+def latest(body_com: pd.DataFrame, activity_level: pd.DataFrame, goal_diet: pd.DataFrame) -> pd.DataFrame:
+    if body_com.empty:
+        return body_com
+    if "updated_at" in body_com:
+        body_com = body_com.sort_values("updated_at", na_position="first", kind="stable")
+    return latest_inputs(with_reference(body_com, activity_level, goal_diet)).reset_index()
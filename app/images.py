@@ -0,0 +1,54 @@
+import hashlib
+import os
+import tempfile
+from urllib.parse import unquote
+
+import streamlit as st
+
+import perf
+import uploads
+
+# Meal photos and thumbnails already downloaded, by URL
+IMAGE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "my_fitness_tracker", "images"))
+
+
+def _path(key: str) -> str:
+    return os.path.join(IMAGE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".jpg")
+
+
+def _read_or_create(key: str, create) -> bytes:
+    path = _path(key)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    payload = create()
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+    return payload
+
+
+# Download through the bucket (the URL is the blob's public_url), so the photo doesn't
+# have to be publicly readable
+def _download(bucket, url: str) -> bytes:
+    prefix = f"https://storage.googleapis.com/{bucket.name}/"
+    with perf.span("storage:download") as span:
+        payload = bucket.blob(unquote(url[len(prefix):]) if url.startswith(prefix) else url).download_as_bytes()
+        span["docs"] = 1
+    return payload
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def image_bytes(_bucket, url: str) -> bytes:
+    return _read_or_create(url, lambda: _download(_bucket, url))
+
+
+# Thumbnail of a nutrition document; meals logged before thumbnails existed have
+# theirs made from the original once
+@st.cache_data(max_entries=256, show_spinner=False)
+def thumbnail_bytes(_bucket, image_url: str, thumb_url: str | None) -> bytes:
+    if thumb_url:
+        return image_bytes(_bucket, thumb_url)
+    return _read_or_create(image_url + "#thumb",
+                           lambda: uploads.downscale(_download(_bucket, image_url), uploads.THUMB_MAX_SIDE))
@@ -0,0 +1,127 @@
+import itertools
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from google.api_core.exceptions import GoogleAPICallError
+
+import data
+import features
+import perf
+
+# Rows parsed, validated and handed to the writers at a time
+CHUNK_ROWS = 5000
+# Rejected rows kept to show back, the rest are only counted
+REJECTED_SAMPLE = 200
+
+# Session dates are "dd/mm/YYYY"; ISO dates (and Excel date cells) are accepted too
+ISO_DATE_FORMAT = "ISO8601"
+
+
+def _excel_chunks(file, chunk_rows: int):
+    # openpyxl is only needed for Excel files
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(column) for column in next(rows, ())]
+        start = 0
+        while batch := list(itertools.islice(rows, chunk_rows)):
+            yield pd.DataFrame(batch, columns=header, index=pd.RangeIndex(start, start + len(batch)), dtype=object)
+            start += len(batch)
+    finally:
+        workbook.close()
+
+
+# DataFrames of at most chunk_rows rows of a CSV or Excel file, indexed by data row
+def read_chunks(file, name: str, chunk_rows: int = CHUNK_ROWS):
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        return _excel_chunks(file, chunk_rows)
+    return pd.read_csv(file, dtype=str, chunksize=chunk_rows, skipinitialspace=True)
+
+
+# Split a chunk into sessions ready to write and rejected rows with their reason.
+# client_id must be a known client and exercise a catalog exercise (in any case);
+# set must be a whole number from 1, rep one too or a time such as "30s" (kept as
+# text, like the rest of the app does), and load_kg a number from 0.
+def normalize(chunk: pd.DataFrame, client_ids: set[str], exercises: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    chunk = chunk.rename(columns=lambda column: str(column).strip().lower())
+    missing = [column for column in features.SESSION_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    text = chunk[features.SESSION_COLUMNS].astype("string").apply(lambda column: column.str.strip())
+
+    sess_date = pd.to_datetime(text["sess_date"], format=features.SESSION_DATE_FORMAT, errors="coerce")
+    sess_date = sess_date.fillna(pd.to_datetime(text["sess_date"], format=ISO_DATE_FORMAT, errors="coerce"))
+    exercise = text["exercise"].str.lower().map({name.lower(): name for name in exercises})
+    sets, rep, load_kg = (pd.to_numeric(text[column], errors="coerce") for column in ["set", "rep", "load_kg"])
+    whole_rep = ((rep >= 1) & (rep % 1 == 0)).fillna(False)
+    timed_rep = text["rep"].str.fullmatch(r"[1-9]\d*s", case=False).fillna(False).astype(bool)
+
+    reasons = np.select(
+        [~text["client_id"].isin(client_ids).fillna(False).to_numpy(dtype=bool),
+         sess_date.isna(),
+         exercise.isna(),
+         ~((sets >= 1) & (sets % 1 == 0)).fillna(False),
+         ~(whole_rep | timed_rep),
+         ~(load_kg >= 0).fillna(False)],
+        ["unknown client_id", "invalid sess_date", "unknown exercise", "invalid set", "invalid rep", "invalid load_kg"],
+        default="")
+    ok = reasons == ""
+    reps = text["rep"].str.lower().astype(object)
+    reps[whole_rep] = rep[whole_rep].astype("int64").tolist()
+
+    sessions = pd.DataFrame({
+        "client_id": text["client_id"][ok].astype(str),
+        "sess_date": sess_date[ok].dt.strftime(features.SESSION_DATE_FORMAT),
+        "exercise": exercise[ok],
+        "set": sets[ok].astype("int64"),
+        "rep": reps[ok],
+        "load_kg": load_kg[ok].round(2),
+    })
+    # Row numbers as in the file, after its header
+    rejected = chunk[~ok].assign(reason=reasons[~ok]).rename(index=lambda i: i + 2)
+    return sessions, rejected
+
+
+# Import a session file chunk by chunk; on_progress(stats) is called as rows are read
+# and written. Returns the stats: rows read, written and rejected, rejections by
+# reason, a sample of the rejected rows, the seconds taken and the error that stopped
+# the import, if any (the sessions written before it stay written).
+def import_file(file, name: str, client_ids: set[str], exercises: list[str], on_progress=None) -> dict:
+    stats = {"read": 0, "written": 0, "rejected": 0, "reasons": Counter(), "sample": [], "seconds": 0.0,
+             "error": None}
+    start = time.perf_counter()
+
+    def report(written=None):
+        if written is not None:
+            stats["written"] = written
+        stats["seconds"] = time.perf_counter() - start
+        if on_progress is not None:
+            on_progress(stats)
+
+    def valid_chunks():
+        for chunk in read_chunks(file, name):
+            with perf.span("transform:validate import") as span:
+                sessions, rejected = normalize(chunk, client_ids, exercises)
+                span["docs"] = len(chunk)
+            stats["read"] += len(chunk)
+            stats["rejected"] += len(rejected)
+            stats["reasons"].update(rejected["reason"])
+            sampled = sum(len(sample) for sample in stats["sample"])
+            if sampled < REJECTED_SAMPLE:
+                stats["sample"].append(rejected.head(REJECTED_SAMPLE - sampled))
+            report()
+            yield sessions.to_dict("records")
+
+    try:
+        with perf.span("write:import sessions") as span:
+            data.import_sessions(valid_chunks(), on_progress=report)
+            span["docs"] = stats["written"]
+    except (ValueError, GoogleAPICallError) as e:
+        stats["error"] = str(e)
+    stats["sample"] = pd.concat(stats["sample"]) if stats["sample"] else pd.DataFrame()
+    report()
+    return stats
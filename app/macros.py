@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import food
+
+# Per-100g columns of the food table and the name of the macro they add up to
+NUTRIENTS = {
+    "Calories_per_100g (kcal)": "Calories",
+    "Protein_per_100g (g)": "Protein",
+    "Fat_per_100g (g)": "Fats",
+    "Carbs_per_100g (g)": "Carbohydrates",
+    "Sugars_per_100g (g)": "Sugar",
+    "Sodium_per_100g (mg)": "Sodium (mg)",
+}
+MACROS = list(NUTRIENTS.values())
+
+
+# Items x nutrients matrix of per-gram values, in food table row order
+def nutrient_matrix(food_table: pd.DataFrame) -> np.ndarray:
+    return np.ascontiguousarray(food_table[list(NUTRIENTS)].to_numpy(dtype="float64") / 100)
+
+
+# The matrix of the current food table, converted once per sheet revision
+@st.cache_data(max_entries=2, show_spinner=False)
+def food_matrix(revision: str) -> np.ndarray:
+    return nutrient_matrix(food.load_food_table(revision))
+
+
+# Macros of each entry; rows index the matrix, grams is the weight eaten of each
+def entry_macros(matrix: np.ndarray, rows, grams) -> np.ndarray:
+    return matrix[np.asarray(rows)] * np.asarray(grams, dtype="float64")[:, None]
+
+
+# Macros of all entries together, e.g. one meal
+def total_macros(matrix: np.ndarray, rows, grams) -> pd.Series:
+    return pd.Series(np.asarray(grams, dtype="float64") @ matrix[np.asarray(rows)], index=MACROS)
+
+
+# Macros of the entries summed per group, e.g. per day or per meal over a date range
+def grouped_macros(matrix: np.ndarray, rows, grams, groups) -> pd.DataFrame:
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    totals = np.zeros((len(labels), matrix.shape[1]))
+    np.add.at(totals, codes, entry_macros(matrix, rows, grams))
+    return pd.DataFrame(totals, index=labels, columns=MACROS)
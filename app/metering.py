@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import perf
+
+# Documents one rerun of a page may read or write before it is logged and flagged as
+# over budget in the Performance view
+RERUN_READ_BUDGET = int(os.environ.get("RERUN_READ_BUDGET", "1000"))
+RERUN_WRITE_BUDGET = int(os.environ.get("RERUN_WRITE_BUDGET", "500"))
+
+# Most recent reruns whose counts are kept per process
+RERUN_HISTORY = 2000
+
+KINDS = ["reads", "writes", "deletes"]
+
+# Firestore objects returned by calls that are handed out wrapped, by class name
+_WRAPPED = {"CollectionReference", "Query", "DocumentReference", "WriteBatch", "AggregationQuery"}
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide counts per rerun, and per day, page and user
+@st.cache_resource(show_spinner=False)
+def _meters() -> dict:
+    return {"reruns": OrderedDict(), "daily": {}, "lock": threading.Lock()}
+
+
+def _user() -> str:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or "username" not in ctx.session_state:
+        return "-"
+    return ctx.session_state["username"] or "-"
+
+
+def _record(kind: str, n: int) -> None:
+    page, session, rerun = perf.current_rerun()
+    user = _user()
+    meters = _meters()
+    over = None
+    with meters["lock"]:
+        day = meters["daily"].setdefault((date.today().isoformat(), page, user), dict.fromkeys(KINDS, 0))
+        day[kind] += n
+        if rerun is not None:
+            reruns = meters["reruns"]
+            meter = reruns.get((session, rerun))
+            if meter is None:
+                meter = reruns[(session, rerun)] = {"page": page, "user": user} | dict.fromkeys(KINDS, 0) | \
+                    {"over budget": ""}
+                while len(reruns) > RERUN_HISTORY:
+                    reruns.popitem(last=False)
+            budget = RERUN_READ_BUDGET if kind == "reads" else RERUN_WRITE_BUDGET
+            if meter[kind] <= budget < meter[kind] + n:
+                over = budget
+                meter["over budget"] = " ".join(filter(None, [meter["over budget"], kind]))
+            meter[kind] += n
+    # Reads mostly happen inside cached functions, where creating Streamlit elements
+    # would be replayed on cache hits, so this is only logged
+    if over is not None:
+        logger.warning("%s rerun %s of %s is over its budget of %d %s", page, rerun, user, over, kind)
+
+
+def _unwrap(value):
+    if isinstance(value, _Metered):
+        return value._target
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+def _wrap(value):
+    return _Metered(value) if type(value).__name__ in _WRAPPED else value
+
+
+# Queries are billed per document returned, and at least one read
+def _counted_stream(docs):
+    n = 0
+    try:
+        for doc in docs:
+            n += 1
+            yield doc
+    finally:
+        _record("reads", max(n, 1))
+
+
+# Proxy of a Firestore client, query, document or batch that counts the document reads,
+# writes and deletes they are billed for
+class _Metered:
+    __slots__ = ("_target", "_pending")
+
+    def __init__(self, target):
+        self._target = target
+        self._pending = dict.fromkeys(KINDS, 0)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._call(name, attr, args, kwargs)
+        return call
+
+    def _call(self, name, method, args, kwargs):
+        kind = type(self._target).__name__
+        if kind == "WriteBatch" and name in ("set", "create", "update", "delete"):
+            self._pending["deletes" if name == "delete" else "writes"] += 1
+        result = method(*_unwrap(args), **_unwrap(kwargs))
+        if name == "stream":
+            return _counted_stream(result)
+        if name == "get":
+            if kind == "DocumentReference":
+                _record("reads", 1)
+            elif kind == "AggregationQuery":
+                # One read per batch of up to 1000 index entries counted
+                _record("reads", max(1, -(-sum(r.value for row in result for r in row) // 1000)))
+            else:
+                _record("reads", max(1, len(result)))
+        elif kind == "DocumentReference" and name in ("set", "create", "update"):
+            _record("writes", 1)
+        elif kind == "DocumentReference" and name == "delete":
+            _record("deletes", 1)
+        elif kind == "CollectionReference" and name == "add":
+            _record("writes", 1)
+        elif kind == "WriteBatch" and name == "commit":
+            for counted, n in self._pending.items():
+                if n:
+                    _record(counted, n)
+            self._pending = dict.fromkeys(KINDS, 0)
+        return _wrap(result)
+
+
+def metered(client):
+    return _Metered(client)
+
+
+# ------------------- Reports -------------------
+
+def reruns() -> pd.DataFrame:
+    meters = _meters()
+    with meters["lock"]:
+        rows = [{"session": session, "rerun": rerun} | meter for (session, rerun), meter in meters["reruns"].items()]
+    return pd.DataFrame(rows, columns=["page", "user", "session", "rerun"] + KINDS + ["over budget"])
+
+
+def daily_totals() -> pd.DataFrame:
+    meters = _meters()
+    with meters["lock"]:
+        rows = [{"date": day, "page": page, "user": user} | counts
+                for (day, page, user), counts in meters["daily"].items()]
+    return pd.DataFrame(rows, columns=["date", "page", "user"] + KINDS).sort_values(
+        ["date", "reads"], ascending=[False, False], ignore_index=True)
@@ -1,73 +1,17 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.figure_factory as ff
-import firebase_admin
-from firebase_admin import credentials, firestore, storage, initialize_app
-from datetime import datetime
-import streamlit_authenticator as stauth
-import bcrypt
-import time
-import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-
-# Initialize Firebase
-firebase_secrets = st.secrets["firebase"]
-
-if not firebase_admin._apps:
-    cred = credentials.Certificate({
-        "type": firebase_secrets["type"],
-        "project_id": firebase_secrets["project_id"],
-        "private_key_id": firebase_secrets["private_key_id"],
-        "private_key": firebase_secrets["private_key"].replace('\\n', '\n'),
-        "client_email": firebase_secrets["client_email"],
-        "client_id": firebase_secrets["client_id"],
-        "auth_uri": firebase_secrets["auth_uri"],
-        "token_uri": firebase_secrets["token_uri"],
-        "auth_provider_x509_cert_url": firebase_secrets["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": firebase_secrets["client_x509_cert_url"]
-    })
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-storage_client = storage.bucket("fitness-tracker-c51bf.firebasestorage.app")
-
-# Function to verify password
-def verify_password(plain_password,hashed_password):
-    return bcrypt.checkpw(plain_password.encode(),hashed_password.encode())
-
-# Check if user is already logged in
-if "authenticated" not in st.session_state:
-    st.session_state["authenticated"] = False
-    st.session_state["username"] = None
-
-# Fetch user credentials from Firestore
-users_ref = db.collection("credentials").stream()
-credentials_dict = {}
-for user in users_ref:
-    user_data = user.to_dict()
-    if "username" in user_data:
-        credentials_dict[user_data["username"]] = user_data
+from datetime import date, timedelta
+import auth
+import connection
+import data
+import perf
+
+auth.init_session_state()
+perf.begin_rerun("nutrition")
 
 # If user is already logged in, skip login screen
 if not st.session_state["authenticated"]:
-    st.title("Login")
-
-    if st.button("Login"):
-        user_data = credentials_dict.get(username_input)
-
-        if user_data and verify_password(password_input,user_data["password"]):
-            st.session_state["authenticated"] = True
-            st.session_state["username"] = username_input
-            st.session_state["name"] = user_data["name"]  # Store name in session state
-            st.session_state["login_timestamp"] = time.time()
-            st.success(f"Welcome, {user_data['name']}!")
-            st.title('Homepage')
-        else:
-            st.error("Username/password is incorrect")
+    auth.login_form()
 
 else:
     if "authenticated" in st.session_state and st.session_state["authenticated"]:
@@ -77,10 +21,12 @@ else:
             st.markdown("---")
             
             st.sidebar.title("Nutrition")
-            sess_action = st.sidebar.radio("To View", ["Nutrition Log", "Food Table"])
+            sess_action = st.sidebar.radio("To View", ["Nutrition Log", "Meal History", "Food Table"])
 
             # Show what was done for Selected Session
             if sess_action == "Nutrition Log":
+                # Each view loads its own dependencies (Pillow, gspread, AgGrid) when opened
+                import uploads
 
                 st.write("### Nutrition Log")
                 meal_options = ["Breakfast","Lunch","Dinner","Morning Snack","Afternoon Snack","Night Snack","Supper"]
@@ -90,40 +36,63 @@ else:
 
                 if st.button("Upload"):
                     if uploaded_file:
-                        blob = storage_client.blob(f"nutrition/{username}/{date_selected}/{meal_selected}.jpg")
-                        blob.upload_from_file(uploaded_file)
-                        db.collection("nutrition").add({
-                            "client_id": username,
-                            "date": date_selected.strftime('%Y-%m-%d'),
-                            "meal": meal_selected,
-                            "image_url": blob.public_url
-                        })
-                        st.success("Meal uploaded successfully!")
-                        st.rerun()
+                        # Downscaled, uploaded and logged in the background
+                        uploads.submit_meal_photo(connection.bucket(), username, date_selected, meal_selected, uploaded_file)
+
+                uploads.upload_status()
+
+            if sess_action == "Meal History":
+                import images
+
+                st.write("### Meal History")
+                picked = st.date_input("Date range",(date.today() - timedelta(days=30),date.today()))
+                start, end = picked[0], picked[-1]
+
+                # Pages are only read, and their thumbnails only downloaded, once "Load more" reaches them
+                pages_key = f"meal_pages_{start}_{end}"
+                pages = st.session_state.setdefault(pages_key, 1)
+
+                cursor = None
+                for page in range(pages):
+                    meals, cursor = data.fetch_meals_page(username, start, end, cursor)
+                    columns = st.columns(4)
+                    for i, meal in enumerate(meals):
+                        with columns[i % 4]:
+                            st.image(images.thumbnail_bytes(connection.bucket(), meal["image_url"], meal.get("thumb_url")),
+                                     caption=f"{meal['date']} - {meal['meal']}")
+                            if st.toggle("Full photo", key=f"full_{meal['id']}"):
+                                st.image(images.image_bytes(connection.bucket(), meal["image_url"]))
+                    if cursor is None:
+                        break
+
+                if page == 0 and not meals:
+                    st.info("No meals logged in this date range")
+                if cursor is not None and st.button("Load more"):
+                    st.session_state[pages_key] = pages + 1
+                    st.rerun()
 
             if sess_action == "Food Table":
-                # Google Sheets credentials and URL setup
-                gs_scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-                creds_dict = st.secrets["gcp_service_account"]
-                gs_creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, gs_scope)
-                gc = gspread.authorize(gs_creds)
-
-                sheet_url = "https://docs.google.com/spreadsheets/d/1nfQfBRdZkBcI7ZISrLu1ko-MYmizOTa_EV5panWtJjI"
+                import numpy as np
+                from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+                import food
+                import macros
 
                 st.write("### Food Nutrition Table")
                 st.write("##### Select and Filter Food Items")
 
-                spreadsheet = gc.open_by_url(sheet_url)  # This gets the spreadsheet
-                worksheet = spreadsheet.worksheet("Sheet1")  # This gets the first worksheet
-                data = worksheet.get_all_records()  # This gets the records
-                df = pd.DataFrame(data)
-                df = df.fillna(0)
-                df = df.replace(to_replace='N/A', value=0)
-                df["Weight (g)"] = pd.to_numeric(df["Weight (g)"], errors="coerce").fillna(0)
-                
+                # Cleaned food table and its nutrient matrix, only rebuilt when the sheet has been edited
+                with perf.span("read:food table") as span:
+                    revision = food.sheet_revision()
+                    df = food.load_food_table(revision)
+                    matrix = macros.food_matrix(revision)
+                    span["docs"] = len(df)
+                # Hidden row_id column ties the selected rows back to the matrix
+                df = df.assign(row_id=np.arange(len(df)))
+
                 # Build grid options
                 gb = GridOptionsBuilder.from_dataframe(df)
                 gb.configure_default_column(filter=True, sortable=True, resizable=True)  # ✅ Enable filters
+                gb.configure_column("row_id", hide=True)
                 gb.configure_selection(selection_mode="multiple", use_checkbox=True)     # ✅ Enable checkbox
                 gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=15)  # Optional: pagination
                 gb.configure_side_bar()  # optional: adds filter/sort panel
@@ -158,39 +127,22 @@ else:
                         )
                         weight_inputs.append(weight)
 
-                    macro_columns = [
-                        "Calories_per_100g (kcal)",
-                        "Protein_per_100g (g)",
-                        "Fat_per_100g (g)",
-                        "Carbs_per_100g (g)",
-                        "Sugars_per_100g (g)",
-                        "Sodium_per_100g (mg)"
-                    ]
-
-                    for col in macro_columns:
-                        selected_df[col] = pd.to_numeric(selected_df[col], errors='coerce').fillna(0)
-
                     # Compute macros based on user input
-                    macro_table = pd.DataFrame({
-                        "Item": selected_df["Item"],
-                        "Calories": (selected_df["Calories_per_100g (kcal)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                        "Protein": (selected_df["Protein_per_100g (g)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                        "Fats": (selected_df["Fat_per_100g (g)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                        "Carbohydrates": (selected_df["Carbs_per_100g (g)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                        "Sugar": (selected_df["Sugars_per_100g (g)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                        "Sodium (mg)": (selected_df["Sodium_per_100g (mg)"] * pd.Series(weight_inputs) / 100).fillna(0).astype(int),
-                    })
+                    rows = selected_df["row_id"].astype(int).to_numpy()
+                    macro_table = pd.DataFrame(macros.entry_macros(matrix, rows, weight_inputs), columns=macros.MACROS)
+                    macro_table.insert(0, "Item", selected_df["Item"].to_numpy())
 
                     st.markdown("### 🥗 Macros Table")
-                    st.dataframe(macro_table.style.format("{:.2f}"))
+                    st.dataframe(macro_table.style.format("{:.2f}", subset=macros.MACROS))
 
                     st.markdown("### 🔢 Total Macros")
+                    totals = macros.total_macros(matrix, rows, weight_inputs).round(1)
                     st.write({
-                        "Calories (kcal)": macro_table["Calories"].sum().round(1),
-                        "Protein (g)": macro_table["Protein"].sum().round(1),
-                        "Fats (g)": macro_table["Fats"].sum().round(1),
-                        "Carbohydrates (g)": macro_table["Carbohydrates"].sum().round(1),
-                        "Sugar (g)": macro_table["Sugar"].sum().round(1),
-                        "Sodium (mg)": macro_table["Sodium (mg)"].sum().round(1),
+                        "Calories (kcal)": totals["Calories"],
+                        "Protein (g)": totals["Protein"],
+                        "Fats (g)": totals["Fats"],
+                        "Carbohydrates (g)": totals["Carbohydrates"],
+                        "Sugar (g)": totals["Sugar"],
+                        "Sodium (mg)": totals["Sodium (mg)"],
                     })
 
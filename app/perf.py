@@ -0,0 +1,96 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Most recent spans kept per process; older ones are dropped
+SPAN_BUFFER_SIZE = 10_000
+
+
+# Process-wide ring buffer of finished spans
+@st.cache_resource(show_spinner=False)
+def _buffer():
+    return deque(maxlen=SPAN_BUFFER_SIZE), threading.Lock()
+
+
+# Called at the top of every page: spans recorded until the next call belong to this
+# rerun of this page
+def begin_rerun(page: str) -> None:
+    st.session_state["perf_page"] = page
+    st.session_state["perf_rerun"] = st.session_state.get("perf_rerun", 0) + 1
+
+
+# Page, browser session and rerun number the calling thread is working for
+def current_rerun() -> tuple[str, str | None, int | None]:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        # Background work, e.g. meal photo uploads
+        return "background", None, None
+    state = ctx.session_state
+    return state["perf_page"] if "perf_page" in state else "-", ctx.session_id, \
+        state["perf_rerun"] if "perf_rerun" in state else None
+
+
+# Time a block; set span["docs"] inside it to record how many documents or rows it handled
+@contextmanager
+def span(name: str):
+    record = {"name": name, "docs": None}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = (time.perf_counter() - start) * 1000
+        record["page"], record["session"], record["rerun"] = current_rerun()
+        record["at"] = time.time()
+        spans, lock = _buffer()
+        with lock:
+            spans.append(record)
+
+
+# Decorator form of span; docs gets the result and returns its document count
+def timed(name: str, docs=len):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name) as record:
+                result = func(*args, **kwargs)
+                record["docs"] = docs(result) if docs else None
+            return result
+        return wrapper
+    return decorate
+
+
+def spans() -> pd.DataFrame:
+    spans, lock = _buffer()
+    with lock:
+        records = list(spans)
+    return pd.DataFrame(records, columns=["at", "page", "session", "rerun", "name", "ms", "docs"])
+
+
+# p50/p95 duration per page and span
+def summary(frame: pd.DataFrame) -> pd.DataFrame:
+    grouped = frame.groupby(["page", "name"])
+    return pd.DataFrame({
+        "count": grouped.size(),
+        "p50 ms": grouped["ms"].quantile(0.5),
+        "p95 ms": grouped["ms"].quantile(0.95),
+        "max ms": grouped["ms"].max(),
+        "docs/span": grouped["docs"].mean(),
+    }).round(1).reset_index().sort_values("p95 ms", ascending=False, ignore_index=True)
+
+
+# Total span time and documents of each rerun, slowest first
+def reruns(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.dropna(subset=["rerun"])
+    grouped = frame.groupby(["page", "session", "rerun"])
+    return pd.DataFrame({
+        "spans": grouped.size(),
+        "span ms": grouped["ms"].sum(),
+        "docs": grouped["docs"].sum(),
+        "at": pd.to_datetime(grouped["at"].min(), unit="s").dt.floor("s"),
+    }).round({"span ms": 1}).reset_index().sort_values("span ms", ascending=False, ignore_index=True)
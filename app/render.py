@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+
+# Tables longer than this are shown in Streamlit's virtualized data grid, which only
+# draws the visible rows, instead of a plotly table with one annotation per cell
+TABLE_ROW_LIMIT = 100
+
+# Charts with more points than this are downsampled with LTTB before they are sent
+CHART_POINT_LIMIT = 500
+
+
+def table(frame: pd.DataFrame, colorscale=None, width: int = 1400) -> None:
+    if len(frame) > TABLE_ROW_LIMIT:
+        with perf.span("chart:data grid") as span:
+            st.dataframe(frame, hide_index=True)
+            span["docs"] = len(frame)
+        return
+    import plotly.figure_factory as ff
+
+    with perf.span("chart:plotly table") as span:
+        fig = ff.create_table(frame, colorscale=colorscale) if colorscale else ff.create_table(frame)
+        fig.layout.width = width
+        st.write(fig)
+        span["docs"] = len(frame)
+
+
+# Largest-Triangle-Three-Buckets: positions of the threshold points (first and last
+# included) that keep the shape of the line, one point per bucket
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The next bucket is represented by its mean point, the last one by the last point
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        mean_x, mean_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+# One Rep Max over time of one exercise
+def progress_chart(history: pd.DataFrame, title: str) -> None:
+    import plotly.express as px
+
+    with perf.span("chart:1RM progress") as span:
+        history = history.dropna(subset=["one_rm"]).sort_values("sess_date")
+        if len(history) > CHART_POINT_LIMIT:
+            x = history["sess_date"].to_numpy(dtype="datetime64[ns]").astype("int64")
+            history = history.iloc[lttb(x, history["one_rm"].to_numpy(), CHART_POINT_LIMIT)]
+        st.plotly_chart(px.line(history, x="sess_date", y="one_rm", title=title))
+        span["docs"] = len(history)
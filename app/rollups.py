@@ -0,0 +1,200 @@
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from firebase_admin import firestore
+
+import connection
+import features
+
+# Firestore allows at most 500 writes per batch
+BATCH_SIZE = 500
+
+
+def _db():
+    return connection.db()
+
+
+# ------------------- one_rm_daily -------------------
+# One document per client, session date and exercise holding the mean One Rep Max of
+# that day by every formula, so progress views read a few rows instead of every set
+# ever logged.
+
+ONE_RM_COLUMNS = list(features.ONE_RM_COLUMNS.values())
+# Documents built before the other formulas were added only hold Epley's one_rm
+ONE_RM_MARKER = "one_rm_daily_v2"
+
+
+def one_rm_doc_id(client_id: str, sess_date: str, exercise: str) -> str:
+    return hashlib.sha1(f"{client_id}\x00{sess_date}\x00{exercise}".encode()).hexdigest()
+
+
+def _one_rm_fields(client_id, sess_date, exercise, estimates) -> dict:
+    return {
+        "client_id": client_id,
+        "sess_date": sess_date,
+        "exercise": exercise,
+        **{column: None if pd.isna(value) else float(value) for column, value in zip(ONE_RM_COLUMNS, estimates)},
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+
+
+# Recompute one day's mean One Rep Max of one exercise from its (few) session documents,
+# writing it as part of batch if one is given
+def refresh_one_rm(client_id: str, sess_date: str, exercise: str, batch=None) -> None:
+    query = (_db().collection("session")
+             .where("client_id", "==", client_id)
+             .where("sess_date", "==", sess_date)
+             .where("exercise", "==", exercise))
+    _, rm = features.engineer_sessions(pd.DataFrame([doc.to_dict() for doc in query.stream()]))
+    ref = _db().collection("one_rm_daily").document(one_rm_doc_id(client_id, sess_date, exercise))
+    writer = batch or _db().batch()
+    if rm["one_rm"].notna().any():
+        writer.set(ref, _one_rm_fields(client_id, sess_date, exercise, rm[ONE_RM_COLUMNS].iloc[0]))
+    else:
+        writer.delete(ref)
+    if batch is None:
+        writer.commit()
+
+
+# Every session document; only read by the one-time rebuilds below
+def _all_sessions() -> pd.DataFrame:
+    return pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in _db().collection("session").stream()])
+
+
+# Rebuild every one_rm_daily document from the session collection
+def rebuild_one_rm() -> None:
+    _, rm = features.engineer_sessions(_all_sessions())
+    rm = rm.dropna(subset=["one_rm"])
+    dates = rm["sess_date"].dt.strftime(features.SESSION_DATE_FORMAT)
+    estimates = rm[ONE_RM_COLUMNS].to_numpy()
+    for start in range(0, len(rm), BATCH_SIZE):
+        batch = _db().batch()
+        for row, sess_date, row_estimates in zip(rm.iloc[start:start + BATCH_SIZE].itertuples(),
+                                                 dates.iloc[start:start + BATCH_SIZE], estimates[start:start + BATCH_SIZE]):
+            ref = _db().collection("one_rm_daily").document(one_rm_doc_id(row.client_id, sess_date, row.exercise))
+            batch.set(ref, _one_rm_fields(row.client_id, sess_date, row.exercise, row_estimates))
+        batch.commit()
+    _db().collection("rollups").document(ONE_RM_MARKER).set({"built_at": firestore.SERVER_TIMESTAMP})
+
+
+# Sessions logged before a rollup existed are rolled up once, by the first process that
+# finds its rollups/<name> marker missing
+@st.cache_resource(show_spinner="Building rollups...")
+def _ensure_built(name: str, _rebuild) -> bool:
+    if not _db().collection("rollups").document(name).get().exists:
+        _rebuild()
+    return True
+
+
+def fetch_one_rm(client_id: str) -> pd.DataFrame:
+    _ensure_built(ONE_RM_MARKER, rebuild_one_rm)
+    query = _db().collection("one_rm_daily").where("client_id", "==", client_id)
+    rm = pd.DataFrame([doc.to_dict() for doc in query.stream()], columns=features.RM_KEYS + ONE_RM_COLUMNS)
+    rm["sess_date"] = features.parse_sess_date(rm["sess_date"])
+    return rm.sort_values(features.RM_KEYS, ignore_index=True)
+
+
+# ------------------- session_months -------------------
+# One document per month ("YYYY-MM") counting session documents per client and day:
+#   days: {client_id: {"dd": count}}
+# so the admin dashboard reads two documents instead of every session.
+
+def month_of(sess_date: str) -> str:
+    _, month, year = sess_date.split("/")
+    return f"{year}-{month}"
+
+
+# Add delta to a client's session count of the day, as part of batch if one is given
+def count_session_day(client_id: str, sess_date: str, delta: int, batch=None) -> None:
+    month, day = month_of(sess_date), sess_date.split("/")[0]
+    ref = _db().collection("session_months").document(month)
+    fields = {"days": {client_id: {day: firestore.Increment(delta)}}}
+    if batch is None:
+        ref.set(fields, merge=True)
+    else:
+        batch.set(ref, fields, merge=True)
+
+
+def rebuild_session_months() -> None:
+    session = _all_sessions()
+    if not session.empty:
+        dates = features.parse_sess_date(session["sess_date"])
+        counts = session.groupby([dates.dt.strftime("%Y-%m"), session["client_id"], dates.dt.strftime("%d")]).size()
+        months = list(counts.groupby(level=0))
+        for start in range(0, len(months), BATCH_SIZE):
+            batch = _db().batch()
+            for month, month_counts in months[start:start + BATCH_SIZE]:
+                days = {}
+                for (_, client_id, day), count in month_counts.items():
+                    days.setdefault(client_id, {})[day] = int(count)
+                batch.set(_db().collection("session_months").document(month), {"days": days})
+            batch.commit()
+    _db().collection("rollups").document("session_months").set({"built_at": firestore.SERVER_TIMESTAMP})
+
+
+# Days with at least one session per client in the given month
+def fetch_session_days(month: str) -> dict[str, int]:
+    _ensure_built("session_months", rebuild_session_months)
+    snapshot = _db().collection("session_months").document(month).get()
+    days = (snapshot.to_dict() or {}).get("days", {}) if snapshot.exists else {}
+    active = {client_id: sum(1 for count in counts.values() if count > 0) for client_id, counts in days.items()}
+    return {client_id: n for client_id, n in active.items() if n > 0}
+
+
+def count_clients() -> int:
+    return _db().collection("client").count().get()[0][0].value
+
+
+# ------------------- client_index -------------------
+# One document mapping every client_id to the client's name, for the client pickers:
+#   clients: {client_id: {"first_name": ..., "last_name": ...}}
+
+INDEX_FIELDS = ["client_id", "first_name", "last_name"]
+
+
+def _client_index_ref():
+    return _db().collection("client_index").document("all")
+
+
+def index_client(client: dict) -> None:
+    _client_index_ref().set(
+        {"clients": {client["client_id"]: {"first_name": client["first_name"], "last_name": client["last_name"]}}},
+        merge=True)
+
+
+def rebuild_client_index() -> None:
+    clients = {}
+    for doc in _db().collection("client").select(INDEX_FIELDS).stream():
+        client = doc.to_dict()
+        clients[client["client_id"]] = {"first_name": client.get("first_name", ""), "last_name": client.get("last_name", "")}
+    _client_index_ref().set({"clients": clients})
+    _db().collection("rollups").document("client_index").set({"built_at": firestore.SERVER_TIMESTAMP})
+
+
+def fetch_client_index() -> dict[str, dict]:
+    _ensure_built("client_index", rebuild_client_index)
+    snapshot = _client_index_ref().get()
+    return (snapshot.to_dict() or {}).get("clients", {}) if snapshot.exists else {}
+
+
+# ------------------- sess_day -------------------
+# Sessions are written with an ISO sess_day next to sess_date; older ones get it once.
+
+def rebuild_sess_day() -> None:
+    session = _all_sessions()
+    if "sess_day" in session:
+        session = session[session["sess_day"].isna()]
+    for start in range(0, len(session), BATCH_SIZE):
+        batch = _db().batch()
+        for row in session.iloc[start:start + BATCH_SIZE].itertuples():
+            sess_day = datetime.strptime(row.sess_date, features.SESSION_DATE_FORMAT).date()
+            batch.update(_db().collection("session").document(row.id), {"sess_day": sess_day.isoformat()})
+        batch.commit()
+    _db().collection("rollups").document("sess_day").set({"built_at": firestore.SERVER_TIMESTAMP})
+
+
+def ensure_sess_day() -> None:
+    _ensure_built("sess_day", rebuild_sess_day)
+
@@ -1,99 +1,40 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.figure_factory as ff
-import firebase_admin
-from firebase_admin import credentials, firestore, storage, initialize_app
-from datetime import datetime
-import streamlit_authenticator as stauth
-import bcrypt
-import time
-import json
-
-# Initialize Firebase
-firebase_secrets = st.secrets["firebase"]
-
-if not firebase_admin._apps:
-    cred = credentials.Certificate({
-        "type": firebase_secrets["type"],
-        "project_id": firebase_secrets["project_id"],
-        "private_key_id": firebase_secrets["private_key_id"],
-        "private_key": firebase_secrets["private_key"].replace('\\n', '\n'),
-        "client_email": firebase_secrets["client_email"],
-        "client_id": firebase_secrets["client_id"],
-        "auth_uri": firebase_secrets["auth_uri"],
-        "token_uri": firebase_secrets["token_uri"],
-        "auth_provider_x509_cert_url": firebase_secrets["auth_provider_x509_cert_url"],
-        "client_x509_cert_url": firebase_secrets["client_x509_cert_url"]
-    })
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-storage_client = storage.bucket("fitness-tracker-c51bf.firebasestorage.app")
-
-# Function to verify password
-def verify_password(plain_password,hashed_password):
-    return bcrypt.checkpw(plain_password.encode(),hashed_password.encode())
-
-# Check if user is already logged in
-if "authenticated" not in st.session_state:
-    st.session_state["authenticated"] = False
-    st.session_state["username"] = None
-
-# Fetch user credentials from Firestore
-users_ref = db.collection("credentials").stream()
-credentials_dict = {}
-for user in users_ref:
-    user_data = user.to_dict()
-    if "username" in user_data:
-        credentials_dict[user_data["username"]] = user_data
+import auth
+import catalog
+import data
+import export
+import features
+import perf
+import render
+
+auth.init_session_state()
+perf.begin_rerun("session_log")
 
 # If user is already logged in, skip login screen
 if not st.session_state["authenticated"]:
-    st.title("Login")
-
-    if st.button("Login"):
-        user_data = credentials_dict.get(username_input)
-
-        if user_data and verify_password(password_input,user_data["password"]):
-            st.session_state["authenticated"] = True
-            st.session_state["username"] = username_input
-            st.session_state["name"] = user_data["name"]  # Store name in session state
-            st.session_state["login_timestamp"] = time.time()
-            st.success(f"Welcome, {user_data['name']}!")
-            st.title('Homepage')
-        else:
-            st.error("Username/password is incorrect")
+    auth.login_form()
 
 else:
     # ------------------- Load Data -------------------
     if "authenticated" in st.session_state and st.session_state["authenticated"]:
         username = st.session_state["username"]
         if not username == "admin":
-            client_ref = db.collection("client").where("client_id","==",username).stream()
-            client_data = {doc.id: doc.to_dict() for doc in client_ref}
+            client_data = data.fetch_client(username)
 
-            session_ref = db.collection("session").where("client_id","==",username).stream()
-            session = pd.DataFrame([doc.to_dict() | {"id": doc.id} for doc in session_ref])
+            session = data.fetch_sessions(username)
 
             # ------------------- Engineer Data -------------------
 
-            # Dropping the rows where reps are time-based
-            session = session = session[~session["rep"].astype(str).str.contains("s", na=False)]
-            # converting the string to datetime format
-            session["sess_date"] = pd.to_datetime(session["sess_date"],format="%d/%m/%Y")
-            # Convert "rep" to float64
-            session.rep = session.rep.astype('float64')
-            # Add 'One Rep Max' column to session
-            session["one_rm"] = session["load_kg"] * (1 + 0.0333 * session["rep"])
-            rm = session.groupby(["client_id","sess_date","exercise"])[["one_rm"]].mean().reset_index()
+            with perf.span("transform:engineer_sessions") as span:
+                session, rm = features.engineer_sessions(session)
+                span["docs"] = len(session)
 
             st.markdown("---")
 
             if not session.empty:
                 st.sidebar.title("Session Logs")
-                sess_action = st.sidebar.radio("To View",["Session Details", "Add Workout", "Edit/Delete Workout"])
+                sess_action = st.sidebar.radio("To View",["Session Details", "Add Workout", "Edit/Delete Workout", "Export"])
 
                 # session = session[['client_id','sess_date','exercise','set','rep','load_kg']]
                 session = session[['id','client_id','sess_date','exercise','set','rep','load_kg']]
@@ -104,7 +45,6 @@ else:
 
                 # Show what was done for Selected Session
                 if sess_action == "Session Details":
-
                     dataset = st.container()
                     with dataset:
                         st.markdown("""
@@ -120,33 +60,50 @@ else:
                     st.write("### Session Details")
 
                     session_data_drop_id = session_data.drop(['id'], axis=1)
-                    fig = ff.create_table(session_data_drop_id,colorscale=colorscale)
-                    fig.layout.width = 2000
-                    st.write(fig)
+                    render.table(session_data_drop_id,colorscale=colorscale,width=2000)
 
                 # Add Workouts
                 elif sess_action == "Add Workout":
                     st.write("## Add New Workout Session")
 
+                    # Exercises are staged here and saved together in one batch
+                    staged_workout = st.session_state.setdefault("staged_workout", [])
+                    # Set before the rerun that follows a save, so the message outlives it
+                    if st.session_state.pop("workout_saved", False):
+                        st.success("Workout added successfully!")
+
                     session_date = st.date_input("Select Date")
-                    exercise_ref = db.collection("exercise").stream()
-                    exercise_list = [doc.to_dict()["exercise"] for doc in exercise_ref]
-                    exercise_selected = st.selectbox("Select an Exercise",exercise_list)
+                    exercise_selected = catalog.picker("Select an Exercise", username, "workout_exercise")
                     sets = st.number_input("Sets",min_value=1,max_value=10,value=3)
                     reps = st.number_input("Reps",min_value=1,max_value=20,value=10)
                     load = st.number_input("Load (kg)",min_value=0,max_value=200,value=50)
 
-                    if st.button("Add Workout"):
-                        db.collection("session").add({
-                            "client_id": username,
-                            "sess_date": session_date.strftime('%d/%m/%Y'),
+                    if st.button("Add Exercise") and exercise_selected:
+                        staged_workout.append({
                             "exercise": exercise_selected,
                             "set": sets,
                             "rep": reps,
                             "load_kg": load
                         })
-                        st.success("Workout added successfully!")
-                        st.rerun()
+
+                    if staged_workout:
+                        st.write("### Workout to Save")
+                        st.dataframe(pd.DataFrame(staged_workout))
+
+                        a, b = st.columns(2)
+                        if a.button("Save Workout"):
+                            data.add_sessions([{
+                                "client_id": username,
+                                "sess_date": session_date.strftime('%d/%m/%Y')
+                            } | exercise for exercise in staged_workout])
+                            catalog.remember(username, [exercise["exercise"] for exercise in staged_workout])
+                            staged_workout.clear()
+                            st.session_state["workout_saved"] = True
+                            st.rerun()
+
+                        if b.button("Clear Workout"):
+                            staged_workout.clear()
+                            st.rerun()
 
                 # Edit/Delete Workouts
                 elif sess_action == "Edit/Delete Workout":
@@ -160,7 +117,7 @@ else:
                     load = st.number_input("Load (kg)",min_value=0,max_value=200, value=int(selected_workout["load_kg"].iloc[0]))
 
                     if st.button("Update Workout"):
-                        db.collection("session").document(workout_id).update({
+                        data.update_session(workout_id, {
                             "set": sets,
                             "rep": reps,
                             "load_kg": load
@@ -169,6 +126,13 @@ else:
                         st.rerun()
 
                     if st.button("Delete Workout"):
-                        db.collection("session").document(workout_id).delete()
+                        data.delete_session(workout_id)
                         st.success("Workout deleted successfully!")
                         st.rerun()   
+
+                # Export
+                elif sess_action == "Export":
+                    st.write("### Export My Data")
+                    collection = st.selectbox("Collection",export.COLLECTIONS)
+                    file_format = st.radio("Format",list(export.FORMATS),horizontal=True)
+                    export.download_button(collection,file_format,username)
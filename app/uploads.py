@@ -0,0 +1,91 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from PIL import Image, ImageOps
+
+import data
+import perf
+
+# Longest side, in pixels, of the stored meal photo and of its thumbnail
+PHOTO_MAX_SIDE = 1600
+THUMB_MAX_SIDE = 320
+JPEG_QUALITY = 85
+
+# Setting a chunk size makes Storage use a resumable upload sent in chunks of this
+# size (a multiple of 256 KiB), so a dropped connection only resends one chunk
+CHUNK_SIZE = 4 * 256 * 1024
+
+UPLOAD_WORKERS = 2
+
+
+# Resize to fit max_side (never enlarging) and re-encode as JPEG
+def downscale(image_bytes: bytes, max_side: int) -> bytes:
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _upload(bucket, path: str, payload: bytes) -> str:
+    with perf.span("storage:upload") as span:
+        blob = bucket.blob(path, chunk_size=CHUNK_SIZE)
+        blob.upload_from_file(io.BytesIO(payload), content_type="image/jpeg", size=len(payload))
+        span["docs"] = 1
+    return blob.public_url
+
+
+# Runs on an upload worker: the nutrition document is only written once both
+# files are in Storage
+def _upload_meal(bucket, username, date_selected, meal_selected, image_bytes):
+    prefix = f"nutrition/{username}/{date_selected}/{meal_selected}"
+    with perf.span("transform:downscale photo"):
+        photo, thumb = downscale(image_bytes, PHOTO_MAX_SIDE), downscale(image_bytes, THUMB_MAX_SIDE)
+    image_url = _upload(bucket, f"{prefix}.jpg", photo)
+    thumb_url = _upload(bucket, f"{prefix}_thumb.jpg", thumb)
+    data.add_nutrition({
+        "client_id": username,
+        "date": date_selected.strftime('%Y-%m-%d'),
+        "meal": meal_selected,
+        "image_url": image_url,
+        "thumb_url": thumb_url
+    })
+
+
+@st.cache_resource(show_spinner=False)
+def _upload_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+# Queue a meal photo for upload and return straight away; progress is shown by upload_status
+def submit_meal_photo(bucket, username, date_selected, meal_selected, uploaded_file) -> None:
+    future = _upload_pool().submit(_upload_meal, bucket, username, date_selected, meal_selected,
+                                   uploaded_file.getvalue())
+    st.session_state.setdefault("meal_uploads", []).append((f"{meal_selected} on {date_selected}", future))
+
+
+# Status of this browser session's uploads. Finished uploads are reported once and
+# forgotten; only while some are still running does _uploads_in_flight poll them.
+def upload_status():
+    uploads = st.session_state.get("meal_uploads", [])
+    finished = [(label, future) for label, future in uploads if future.done()]
+    for label, future in finished:
+        if future.exception() is not None:
+            st.error(f"Upload of {label} failed: {future.exception()}")
+        else:
+            st.success(f"{label} uploaded successfully!")
+    st.session_state["meal_uploads"] = [upload for upload in uploads if upload not in finished]
+    if st.session_state["meal_uploads"]:
+        _uploads_in_flight()
+
+
+# Rerun the whole page as soon as an upload finishes, so upload_status reports it
+@st.fragment(run_every=3)
+def _uploads_in_flight():
+    uploads = st.session_state.get("meal_uploads", [])
+    if any(future.done() for _, future in uploads):
+        st.rerun()
+    for label, _ in uploads:
+        st.info(f"Uploading {label}...")
@@ -0,0 +1,82 @@
+# Benchmark of the session feature-engineering pipeline on synthetic session rows.
+# features.engineer_sessions computes every One Rep Max formula; the legacy block only Epley.
+#
+#   python benchmarks/bench_features.py --rows 1000000 --repeat 5
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import features  # noqa: E402
+
+
+# Synthetic rows in the "session" schema: ~5% time-based reps, reps stored as int or str
+def make_sessions(rows, clients=500, exercises=60, days=3 * 365, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2022-01-01", periods=days, freq="D").strftime("%d/%m/%Y").to_numpy()
+    rep = rng.integers(1, 20, rows).astype(object)
+    timed = rng.random(rows) < 0.05
+    rep[timed] = [f"{s}s" for s in rng.integers(20, 90, timed.sum())]
+    as_str = ~timed & (rng.random(rows) < 0.3)
+    rep[as_str] = rep[as_str].astype(str)
+    return pd.DataFrame({
+        "client_id": np.char.add("client_", rng.integers(0, clients, rows).astype(str)),
+        "sess_date": dates[rng.integers(0, days, rows)],
+        "exercise": np.char.add("exercise_", rng.integers(0, exercises, rows).astype(str)),
+        "set": rng.integers(1, 6, rows),
+        "rep": rep,
+        "load_kg": rng.integers(0, 200, rows),
+    })
+
+
+# The block that used to be copied into every page
+def legacy_pipeline(session):
+    session = session[~session["rep"].astype(str).str.contains("s", na=False)].copy()
+    session["sess_date"] = pd.to_datetime(session["sess_date"], format="%d/%m/%Y")
+    session.rep = session.rep.astype('float64')
+    session["one_rm"] = session["load_kg"] * (1 + 0.0333 * session["rep"])
+    rm = session.groupby(["client_id", "sess_date", "exercise"])[["one_rm"]].mean().reset_index()
+    return session, rm
+
+
+def best_of(func, frame, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(frame)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sorted(timings)[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the session feature-engineering pipeline")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time features.engineer_sessions")
+    args = parser.parse_args()
+
+    frame = make_sessions(args.rows)
+    print(f"{args.rows:,} synthetic session rows")
+
+    candidates = {"features.engineer_sessions": features.engineer_sessions}
+    if not args.skip_legacy:
+        candidates["legacy per-page block"] = legacy_pipeline
+        # Both must agree before their timings mean anything
+        new_rm = features.engineer_sessions(frame)[1]
+        old_rm = legacy_pipeline(frame)[1]
+        # (the legacy block only has Epley's one_rm)
+        pd.testing.assert_frame_equal(new_rm[old_rm.columns], old_rm, check_dtype=False)
+
+    for name, func in candidates.items():
+        best, median = best_of(func, frame, args.repeat)
+        print(f"{name:<28} best {best * 1000:9.1f} ms   median {median * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Import-time benchmark of the Streamlit pages.
+#
+# Every page's module-level imports are run in a fresh interpreter (cold start) and
+# then again in the same one (warm: what a Streamlit rerun pays). Imports made inside
+# a page's branches are timed afterwards, as the cost of first opening that view.
+#
+#   python benchmarks/bench_imports.py --repeat 5 --budget-ms 2500
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+PAGES = ["menu.py", "home.py", "session_log.py", "admin.py", "nutrition.py"]
+
+# Runs in the child interpreter: times each import statement in order
+CHILD = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+startup, deferred = json.loads(sys.argv[2])
+
+def run(statements):
+    timings = []
+    for statement in statements:
+        start = time.perf_counter()
+        exec(statement, {})
+        timings.append(time.perf_counter() - start)
+    return timings
+
+cold = run(startup)
+warm = run(startup)
+print(json.dumps({"cold": cold, "warm": warm, "deferred": run(deferred)}))
+"""
+
+
+# Module-level and nested import statements of a page, as source lines
+def page_imports(path):
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    startup = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    deferred = [node for node in ast.walk(tree)
+                if isinstance(node, (ast.Import, ast.ImportFrom)) and node not in startup]
+    return [ast.unparse(node) for node in startup], list(dict.fromkeys(ast.unparse(node) for node in deferred))
+
+
+def time_page(startup, deferred):
+    out = subprocess.run([sys.executable, "-c", CHILD, APP_DIR, json.dumps([startup, deferred])],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the Streamlit pages")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per page")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit non-zero if a page's median cold start exceeds this")
+    parser.add_argument("--pages", nargs="*", default=PAGES)
+    args = parser.parse_args()
+
+    over_budget = []
+    for page in args.pages:
+        startup, deferred = page_imports(os.path.join(APP_DIR, page))
+        runs = [time_page(startup, deferred) for _ in range(args.repeat)]
+        cold = median([sum(run["cold"]) for run in runs])
+        warm = median([sum(run["warm"]) for run in runs])
+        print(f"{page:<16} cold {cold * 1000:8.1f} ms   warm {warm * 1000:6.3f} ms")
+        for i, statement in enumerate(startup):
+            print(f"    {median([run['cold'][i] for run in runs]) * 1000:8.1f} ms  {statement}")
+        for i, statement in enumerate(deferred):
+            print(f"    {median([run['deferred'][i] for run in runs]) * 1000:8.1f} ms  {statement}  (deferred)")
+        if args.budget_ms is not None and cold * 1000 > args.budget_ms:
+            over_budget.append(page)
+
+    if over_budget:
+        print(f"over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
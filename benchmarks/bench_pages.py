@@ -0,0 +1,143 @@
+# Rerun latency and memory of the Streamlit pages against the in-memory Firestore
+# stand-in (fake_firestore.py) filled with synthetic data (synthetic.py).
+#
+#   python benchmarks/bench_pages.py --sizes 10x20 50x100 100x300 --repeat 5
+#
+# A size is <clients>x<training days per client>. For every page view the first run
+# starts from empty Streamlit caches (the imports are already done), the reruns that
+# follow are what a user pays per interaction, and a second cold run under
+# tracemalloc gives the peak memory allocated during one run.
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+sys.path.insert(0, APP_DIR)
+# Importing the app and clearing its caches outside a script run only logs warnings
+logging.disable(logging.WARNING)
+
+import streamlit as st  # noqa: E402
+from firebase_admin import firestore  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import connection  # noqa: E402
+import images  # noqa: E402
+import metering  # noqa: E402
+import synthetic  # noqa: E402
+from fake_firestore import FakeBucket, FakeFirestore  # noqa: E402
+
+# (name, page, username, sidebar choice or None)
+VIEWS = [
+    ("home (client)", "home.py", synthetic.client_id(0), None),
+    ("home (admin)", "home.py", "admin", None),
+    ("session_log", "session_log.py", synthetic.client_id(0), None),
+    ("admin: add client", "admin.py", "admin", None),
+    ("admin: view client", "admin.py", "admin", "View Client session"),
+    ("nutrition: meal history", "nutrition.py", synthetic.client_id(0), "Meal History"),
+]
+
+
+def parse_size(text):
+    clients, sessions = text.lower().split("x")
+    return int(clients), int(sessions)
+
+
+def use_fake(db, bucket, work_dir):
+    # Through the metering proxy, like the real client
+    connection.db = lambda: metering.metered(db)
+    connection.bucket = lambda: bucket
+    images.IMAGE_DIR = os.path.join(work_dir, "images")
+
+
+# Rollups are built once when a dataset is first seen; do it up front so that cost
+# doesn't land in the first measured run
+def build_rollups(db):
+    import rollups
+
+    rollups.rebuild_one_rm()
+    rollups.rebuild_session_months()
+    rollups.rebuild_client_index()
+    db.collection("rollups").document("sess_day").set({"built_at": firestore.SERVER_TIMESTAMP})
+
+
+def clear_caches(work_dir):
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    shutil.rmtree(os.path.join(work_dir, "images"), ignore_errors=True)
+
+
+def run_view(page, username, choice, timeout):
+    app = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=timeout)
+    app.session_state["authenticated"] = True
+    app.session_state["username"] = username
+    app.session_state["name"] = username
+    start = time.perf_counter()
+    app.run()
+    if choice is not None:
+        app.sidebar.radio[0].set_value(choice).run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return app, elapsed
+
+
+def rerun(app):
+    start = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page reruns against an in-memory Firestore")
+    parser.add_argument("--sizes", nargs="*", default=["10x20", "50x100", "100x300"],
+                        help="<clients>x<training days per client>")
+    parser.add_argument("--repeat", type=int, default=5, help="warm reruns per page view")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds a single run may take")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pages_")
+    try:
+        for size in args.sizes:
+            clients, sessions = parse_size(size)
+            db, bucket = FakeFirestore(), FakeBucket()
+            counts = synthetic.populate(db, bucket, clients, sessions)
+            use_fake(db, bucket, work_dir)
+            clear_caches(work_dir)
+            build_rollups(db)
+            print(f"\n{clients} clients x {sessions} days: "
+                  + ", ".join(f"{n:,} {name}" for name, n in counts.items()))
+
+            for name, page, username, choice in VIEWS:
+                clear_caches(work_dir)
+                reads = db.reads
+                app, cold = run_view(page, username, choice, args.timeout)
+                cold_reads = db.reads - reads
+                warm = median([rerun(app) for _ in range(args.repeat)])
+
+                clear_caches(work_dir)
+                tracemalloc.start()
+                run_view(page, username, choice, args.timeout)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"  {name:<24} cold {cold * 1000:8.1f} ms  warm {warm * 1000:7.1f} ms  "
+                      f"peak {peak / 2 ** 20:7.1f} MiB  {cold_reads:>8,} reads")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
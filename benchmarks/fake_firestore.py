@@ -0,0 +1,367 @@
+# In-memory stand-in for the parts of the Firestore and Cloud Storage clients the app
+# uses, so the pages can be load-tested without touching the Firebase project.
+#
+#   db, bucket = FakeFirestore(), FakeBucket("fitness-tracker")
+#   connection.db, connection.bucket = lambda: db, lambda: bucket
+#
+# Queries support where (==, !=, <, <=, >, >=, in, not-in, array_contains), order_by
+# (with Firestore's implicit __name__ ordering), limit, start_after, select and
+# count(); writes support set (merge), update, delete, add and batches of up to 500
+# operations, resolving SERVER_TIMESTAMP and Increment. reads/writes count billed
+# document operations the way Firestore does.
+
+import copy
+import functools
+import io
+import random
+import string
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from google.api_core.exceptions import InvalidArgument, NotFound
+from google.cloud.firestore_v1.transforms import Increment, Sentinel
+
+MAX_BATCH_WRITES = 500
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _field(data: dict, path: str):
+    for key in path.split("."):
+        if not isinstance(data, dict) or key not in data:
+            raise KeyError(path)
+        data = data[key]
+    return data
+
+
+# Replace write transforms by the values they stand for, given the current value
+def _resolve(value, current=None):
+    if isinstance(value, Sentinel):
+        return _now()
+    if isinstance(value, Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    if isinstance(value, dict):
+        return {k: _resolve(v, current.get(k) if isinstance(current, dict) else None) for k, v in value.items()}
+    return copy.deepcopy(value)
+
+
+def _merge(target: dict, fields: dict) -> dict:
+    for key, value in fields.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(value, target.get(key))
+    return target
+
+
+def _compare(a, b) -> int:
+    return (a > b) - (a < b)
+
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+_INEQUALITIES = {"!=", "<", "<=", ">", ">=", "not-in"}
+
+
+# ------------------- Firestore -------------------
+
+class FakeFirestore:
+    def __init__(self, seed: int = 0):
+        self._collections: dict[str, dict[str, dict]] = {}
+        self._lock = threading.RLock()
+        self._ids = random.Random(seed)
+        self.reads = 0
+        self.writes = 0
+
+    def collection(self, path: str) -> "CollectionReference":
+        return CollectionReference(self, path)
+
+    def batch(self) -> "WriteBatch":
+        return WriteBatch(self)
+
+    def _new_id(self) -> str:
+        return "".join(self._ids.choices(string.ascii_letters + string.digits, k=20))
+
+    def _docs(self, path: str) -> dict[str, dict]:
+        return self._collections.setdefault(path, {})
+
+    # Apply the (kind, ref, fields, merge) writes of one commit, all or nothing
+    def _commit(self, writes: list[tuple]) -> None:
+        if len(writes) > MAX_BATCH_WRITES:
+            raise InvalidArgument(f"maximum {MAX_BATCH_WRITES} writes allowed per request")
+        with self._lock:
+            for kind, ref, _, _ in writes:
+                if kind == "update" and ref.id not in self._docs(ref._parent):
+                    raise NotFound(f"No document to update: {ref.path}")
+            for kind, ref, fields, merge in writes:
+                docs = self._docs(ref._parent)
+                if kind == "delete":
+                    docs.pop(ref.id, None)
+                elif kind == "set":
+                    docs[ref.id] = _merge(docs.get(ref.id, {}), fields) if merge else _resolve(fields)
+                else:
+                    doc = docs[ref.id]
+                    for path, value in fields.items():
+                        *parents, key = path.split(".")
+                        target = doc
+                        for parent in parents:
+                            target = target.setdefault(parent, {})
+                        target[key] = _resolve(value, target.get(key))
+            self.writes += len(writes)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: dict | None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> dict | None:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str):
+        return _field(self._data, field_path)
+
+
+class DocumentReference:
+    def __init__(self, db: FakeFirestore, parent: str, doc_id: str):
+        self._db = db
+        self._parent = parent
+        self.id = doc_id
+        self.path = f"{parent}/{doc_id}"
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, **kwargs) -> DocumentSnapshot:
+        with self._db._lock:
+            self._db.reads += 1
+            data = self._db._docs(self._parent).get(self.id)
+            return DocumentSnapshot(self, copy.deepcopy(data))
+
+    def set(self, document_data: dict, merge: bool = False) -> None:
+        self._db._commit([("set", self, document_data, merge)])
+
+    def update(self, field_updates: dict) -> None:
+        self._db._commit([("update", self, field_updates, False)])
+
+    def delete(self) -> None:
+        self._db._commit([("delete", self, None, False)])
+
+
+class WriteBatch:
+    def __init__(self, db: FakeFirestore):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference: DocumentReference, document_data: dict, merge: bool = False) -> None:
+        self._writes.append(("set", reference, document_data, merge))
+
+    def update(self, reference: DocumentReference, field_updates: dict) -> None:
+        self._writes.append(("update", reference, field_updates, False))
+
+    def delete(self, reference: DocumentReference) -> None:
+        self._writes.append(("delete", reference, None, False))
+
+    def commit(self) -> list:
+        self._db._commit(self._writes)
+        return []
+
+
+class _AggregationResult:
+    def __init__(self, value: int):
+        self.alias = "count"
+        self.value = value
+
+
+class AggregationQuery:
+    def __init__(self, query: "Query"):
+        self._query = query
+
+    def get(self, **kwargs) -> list:
+        with self._query._db._lock:
+            count = len(self._query._matches())
+            # One read per batch of up to 1000 index entries
+            self._query._db.reads += max(1, -(-count // 1000))
+        return [[_AggregationResult(count)]]
+
+
+class Query:
+    def __init__(self, db: FakeFirestore, path: str, filters=(), orders=(), limit=None, cursor=None, fields=None):
+        self._db = db
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._cursor = cursor
+        self._fields = fields
+
+    def _copy(self, **changes) -> "Query":
+        state = {"filters": self._filters, "orders": self._orders, "limit": self._limit,
+                 "cursor": self._cursor, "fields": self._fields} | changes
+        return Query(self._db, self._path, **state)
+
+    def where(self, field_path: str, op_string: str, value) -> "Query":
+        if op_string not in _OPERATORS:
+            raise InvalidArgument(f"unsupported operator {op_string!r}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot) -> "Query":
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def select(self, field_paths) -> "Query":
+        return self._copy(fields=list(field_paths))
+
+    def count(self, alias=None) -> AggregationQuery:
+        return AggregationQuery(self)
+
+    # Explicit orders, led by the first inequality field when it isn't ordered on, and
+    # followed by the document id in the direction of the last one
+    def _effective_orders(self) -> list[tuple[str, str]]:
+        orders = list(self._orders)
+        inequality = next((f for f, op, _ in self._filters if op in _INEQUALITIES), None)
+        if inequality and not orders:
+            orders.append((inequality, "ASCENDING"))
+        if not any(field == "__name__" for field, _ in orders):
+            orders.append(("__name__", orders[-1][1] if orders else "ASCENDING"))
+        return orders
+
+    def _value(self, doc_id: str, data: dict, field: str):
+        return doc_id if field == "__name__" else _field(data, field)
+
+    def _cursor_values(self, orders) -> list:
+        cursor = self._cursor
+        if isinstance(cursor, DocumentSnapshot):
+            return [self._value(cursor.id, cursor._data, field) for field, _ in orders]
+        values = []
+        for field, _ in orders:
+            value = cursor[field]
+            values.append(value.id if isinstance(value, DocumentReference) else value)
+        return values
+
+    def _matches(self) -> list[tuple[str, dict]]:
+        orders = self._effective_orders()
+        rows = []
+        for doc_id, data in self._db._docs(self._path).items():
+            try:
+                if not all(_OPERATORS[op](self._value(doc_id, data, f), value) for f, op, value in self._filters):
+                    continue
+                key = [self._value(doc_id, data, field) for field, _ in orders]
+            except (KeyError, TypeError):
+                # Documents missing a filtered or ordered field are not in the index
+                continue
+            rows.append((key, doc_id, data))
+
+        def compare(a, b):
+            for (field, direction), x, y in zip(orders, a, b):
+                result = _compare(x, y)
+                if result:
+                    return -result if direction == "DESCENDING" else result
+            return 0
+
+        rows.sort(key=functools.cmp_to_key(lambda a, b: compare(a[0], b[0])))
+        if self._cursor is not None:
+            after = self._cursor_values(orders)
+            rows = [row for row in rows if compare(row[0], after) > 0]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return [(doc_id, data) for _, doc_id, data in rows]
+
+    def stream(self, **kwargs):
+        with self._db._lock:
+            matches = self._matches()
+            # Queries are billed per document returned, and at least one read
+            self._db.reads += max(1, len(matches))
+            snapshots = []
+            for doc_id, data in matches:
+                if self._fields is not None:
+                    data = {f: _field(data, f) for f in self._fields if self._has(data, f)}
+                snapshots.append(DocumentSnapshot(DocumentReference(self._db, self._path, doc_id),
+                                                  copy.deepcopy(data)))
+        return iter(snapshots)
+
+    def get(self, **kwargs) -> list[DocumentSnapshot]:
+        return list(self.stream())
+
+    @staticmethod
+    def _has(data: dict, field: str) -> bool:
+        try:
+            _field(data, field)
+        except KeyError:
+            return False
+        return True
+
+
+class CollectionReference(Query):
+    def __init__(self, db: FakeFirestore, path: str):
+        super().__init__(db, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: str | None = None) -> DocumentReference:
+        return DocumentReference(self._db, self._path, document_id or self._db._new_id())
+
+    def add(self, document_data: dict, document_id: str | None = None) -> tuple:
+        ref = self.document(document_id)
+        ref.set(document_data)
+        return _now(), ref
+
+    # Bulk load without going through batches, for the data generator
+    def load(self, documents: dict[str, dict]) -> None:
+        with self._db._lock:
+            self._db._docs(self._path).update(documents)
+
+
+# ------------------- Storage -------------------
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.public_url = f"https://storage.googleapis.com/{bucket.name}/{quote(name)}"
+
+    def upload_from_file(self, file_obj, content_type=None, size=None, **kwargs) -> None:
+        payload = file_obj.read(size) if size is not None else file_obj.read()
+        with self.bucket._lock:
+            self.bucket._objects[self.name] = bytes(payload)
+
+    def upload_from_string(self, data, content_type=None, **kwargs) -> None:
+        self.upload_from_file(io.BytesIO(data.encode() if isinstance(data, str) else data))
+
+    def download_as_bytes(self, **kwargs) -> bytes:
+        with self.bucket._lock:
+            if self.name not in self.bucket._objects:
+                raise NotFound(f"No such object: {self.bucket.name}/{self.name}")
+            return self.bucket._objects[self.name]
+
+    def exists(self, **kwargs) -> bool:
+        return self.name in self.bucket._objects
+
+
+class FakeBucket:
+    def __init__(self, name: str = "fitness-tracker"):
+        self.name = name
+        self._objects: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def blob(self, blob_name: str, chunk_size: int | None = None, **kwargs) -> FakeBlob:
+        return FakeBlob(self, blob_name)
@@ -0,0 +1,97 @@
+# Synthetic gym data in the app's Firestore schemas, loaded into the in-memory
+# stand-in of fake_firestore.py.
+#
+#   populate(db, bucket, clients=50, sessions=100)
+#
+# gives 50 clients with 100 training days each (EXERCISES_PER_SESSION exercises of
+# SETS_PER_EXERCISE sets per day), one body_composition record, one meal photo per
+# training day, the reference collections and an "admin" credential.
+
+import io
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import bcrypt
+from PIL import Image
+
+EXERCISES = [f"{kind} {variant}" for kind in ["Squat", "Bench Press", "Deadlift", "Row", "Overhead Press",
+                                              "Lunge", "Pull Up", "Hip Thrust", "Curl", "Dip"]
+             for variant in ["Barbell", "Dumbbell", "Machine"]]
+EXERCISES_PER_SESSION = 4
+SETS_PER_EXERCISE = 3
+MEALS = ["Breakfast", "Lunch", "Dinner", "Morning Snack", "Afternoon Snack", "Night Snack", "Supper"]
+
+ACTIVITY_LEVELS = {"Sedentary": 1.2, "Lightly Active": 1.375, "Moderately Active": 1.55, "Very Active": 1.725}
+GOAL_DIETS = {
+    "Fat Loss": {"cal_adjustment": -500, "protein_%": 40, "carbs_%": 30, "fats_%": 30},
+    "Maintenance": {"cal_adjustment": 0, "protein_%": 30, "carbs_%": 40, "fats_%": 30},
+    "Muscle Gain": {"cal_adjustment": 300, "protein_%": 30, "carbs_%": 45, "fats_%": 25},
+}
+PASSWORD = "password"
+
+
+def client_id(i: int) -> str:
+    return f"client_{i:05d}"
+
+
+def _photo(side: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (side, side), (200, 120, 60)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def populate(db, bucket, clients: int, sessions: int, seed: int = 0) -> dict[str, int]:
+    rng = random.Random(seed)
+    stamp = datetime.now(timezone.utc)
+    first_day = date.today() - timedelta(days=2 * sessions)
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    photo, thumb = _photo(1600), _photo(320)
+
+    docs = {name: {} for name in ["client", "session", "body_composition", "nutrition", "credentials"]}
+    doc_id = iter(f"{n:020d}" for n in range(10 ** 12))
+    for i in range(clients):
+        cid = client_id(i)
+        dob = date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365))
+        docs["client"][next(doc_id)] = {
+            "client_id": cid, "first_name": f"First{i}", "last_name": f"Last{i}",
+            "dob": dob.strftime("%d/%m/%Y"), "program": rng.choice(["Strength", "Hypertrophy"]),
+            "source": rng.choice(["Referral", "Walk-in", "Online"]), "updated_at": stamp,
+        }
+        docs["credentials"][next(doc_id)] = {"username": cid, "password": password, "name": f"First{i} Last{i}"}
+        docs["body_composition"][next(doc_id)] = {
+            "client_id": cid, "dob": dob.strftime("%d/%m/%Y"),
+            "body_wt_kg": round(rng.uniform(50, 110), 1), "body_fats_%": round(rng.uniform(8, 35), 1),
+            "ht_cm": rng.randrange(150, 200), "activity_level": rng.choice(list(ACTIVITY_LEVELS)),
+            "diet": rng.choice(list(GOAL_DIETS)),
+        }
+        # Training days every other day or so, oldest first
+        days = sorted(rng.sample(range(2 * sessions), sessions))
+        for day in (first_day + timedelta(days=d) for d in days):
+            for exercise in rng.sample(EXERCISES, EXERCISES_PER_SESSION):
+                load = rng.randrange(20, 160, 5)
+                for set_number in range(1, SETS_PER_EXERCISE + 1):
+                    # A few holds are logged in seconds
+                    rep = f"{rng.randrange(20, 90)}s" if rng.random() < 0.03 else rng.randrange(3, 15)
+                    docs["session"][next(doc_id)] = {
+                        "client_id": cid, "sess_date": day.strftime("%d/%m/%Y"), "sess_day": day.isoformat(),
+                        "exercise": exercise, "set": set_number, "rep": rep, "load_kg": load,
+                        "updated_at": stamp,
+                    }
+            meal = rng.choice(MEALS)
+            prefix = f"nutrition/{cid}/{day}/{meal}"
+            for path, payload in [(f"{prefix}.jpg", photo), (f"{prefix}_thumb.jpg", thumb)]:
+                bucket.blob(path).upload_from_file(io.BytesIO(payload), content_type="image/jpeg", size=len(payload))
+            docs["nutrition"][next(doc_id)] = {
+                "client_id": cid, "date": day.isoformat(), "meal": meal,
+                "image_url": bucket.blob(f"{prefix}.jpg").public_url,
+                "thumb_url": bucket.blob(f"{prefix}_thumb.jpg").public_url,
+            }
+    docs["credentials"][next(doc_id)] = {"username": "admin", "password": password, "name": "Admin"}
+
+    for name, documents in docs.items():
+        db.collection(name).load(documents)
+    db.collection("exercise").load({next(doc_id): {"exercise": exercise} for exercise in EXERCISES})
+    db.collection("activity_level").load({next(doc_id): {"activity_level": level, "bmr_multiplier": multiplier}
+                                          for level, multiplier in ACTIVITY_LEVELS.items()})
+    db.collection("goal_diet").load({next(doc_id): {"diet": diet} | fields for diet, fields in GOAL_DIETS.items()})
+    return {name: len(documents) for name, documents in docs.items()}